@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+
+import tracing
+
+
+def file_sha256(path):
+    """
+    计算文件内容的 SHA-256。
+
+    :param path: 文件路径
+    :return: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+        tracing.count_bytes("read", f.tell())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    静态分析结果的增量缓存。
+
+    缓存键由源文件内容哈希和分析器 DLL 哈希组成，指向已保存的 .result 文件；
+    源文件或分析器未变化时直接读取 .result，不再调用分析器。
+    索引中同时记录 .result 的内容哈希，.result 被改写（例如同名文件覆盖）时视为未命中。
+    """
+
+    def __init__(self, index_path, analyzer_path, root_path):
+        """
+        :param index_path: 缓存索引文件路径（JSON）
+        :param analyzer_path: C# 分析器的路径，其哈希参与缓存键
+        :param root_path: 被分析源码的根路径，索引中的源文件路径相对于它保存
+        """
+        self.index_path = index_path
+        self.root_path = root_path
+        self.base_dir = os.path.dirname(os.path.abspath(index_path))
+        self.analyzer_hash = file_sha256(analyzer_path)
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self.pending_keys = {}  # 本次运行中已计算过的源文件缓存键
+
+        self.entries = {}
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        self.by_key = {entry["key"]: entry for entry in self.entries.values()}
+
+    def _source_key(self, source_path):
+        return os.path.relpath(source_path, self.root_path).replace(os.sep, "/")
+
+    def _result_key(self, result_file):
+        return os.path.relpath(result_file, self.base_dir).replace(os.sep, "/")
+
+    def lookup(self, source_path):
+        """
+        查找源文件的缓存结果。
+
+        :param source_path: C# 源文件路径
+        :return: 命中时返回分析输出文本，未命中返回 None
+        """
+        key = hashlib.sha256(f"{file_sha256(source_path)}:{self.analyzer_hash}".encode()).hexdigest()
+        self.pending_keys[source_path] = key
+
+        entry = self.by_key.get(key)
+        if entry is not None:
+            result_file = os.path.join(self.base_dir, entry["result"])
+            try:
+                with open(result_file, "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None and hashlib.sha256(data).hexdigest() == entry["result_hash"]:
+                self.hits += 1
+                return data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+        self.misses += 1
+        return None
+
+    def store(self, source_path, result_file):
+        """
+        记录源文件对应的 .result 文件（只应记录分析成功的结果）。
+
+        :param source_path: C# 源文件路径
+        :param result_file: 已写入的 .result 文件路径
+        """
+        key = self.pending_keys.pop(source_path, None)
+        if key is None:
+            key = hashlib.sha256(f"{file_sha256(source_path)}:{self.analyzer_hash}".encode()).hexdigest()
+        entry = {
+            "key": key,
+            "result": self._result_key(result_file),
+            "result_hash": file_sha256(result_file),
+        }
+        self.entries[self._source_key(source_path)] = entry
+        self.by_key[key] = entry
+
+    def prune(self):
+        """
+        删除已不存在的源文件对应的缓存条目，以及不再被任何条目引用的 .result 文件。
+        """
+        removed = [source for source in self.entries
+                   if not os.path.exists(os.path.join(self.root_path, source))]
+        removed_results = {self.entries.pop(source)["result"] for source in removed}
+        self.pruned += len(removed)
+
+        live_results = {entry["result"] for entry in self.entries.values()}
+        for stale_result in removed_results - live_results:
+            try:
+                os.remove(os.path.join(self.base_dir, stale_result))
+            except OSError:
+                pass
+        self.by_key = {entry["key"]: entry for entry in self.entries.values()}
+
+    def save(self):
+        """
+        清理过期条目并写回索引文件。
+        """
+        self.prune()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"analyzer": self.analyzer_hash, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def summary(self):
+        return f"Cache: {self.hits} hits, {self.misses} misses, {self.pruned} pruned"
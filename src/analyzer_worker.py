@@ -0,0 +1,254 @@
+import collections
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import tracing
+from analysis_cache import file_sha256
+
+# C# 分析器项目目录；构建输出（bin/、obj/）不纳入版本库，运行前由 ensure_analyzer 按源码构建
+ANALYZER_PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static_analysis_cs")
+ANALYZER_PATH = os.path.join(ANALYZER_PROJECT_DIR, "bin", "Debug", "net8.0", "static_analysis_cs.dll")
+ANALYZER_SOURCES = ("static_analysis_cs.cs", "static_analysis_cs.csproj")
+
+
+def ensure_analyzer(project_dir=ANALYZER_PROJECT_DIR):
+    """
+    确保 C# 分析器已按当前源码构建。
+
+    构建输出旁记录源码的摘要；DLL 不存在或源码变化（包括旧版本遗留的、不支持 --server 的 DLL）时
+    运行 dotnet build 重新构建。
+
+    :param project_dir: 分析器项目目录
+    :return: 分析器 DLL 路径
+    :raises RuntimeError: 无法构建时（未安装 .NET 8 SDK、无法还原 NuGet 包或编译错误）
+    """
+    analyzer_path = os.path.join(project_dir, "bin", "Debug", "net8.0", "static_analysis_cs.dll")
+    stamp_path = os.path.join(os.path.dirname(analyzer_path), "static_analysis_cs.source.sha256")
+    source_hash = ",".join(file_sha256(os.path.join(project_dir, name)) for name in ANALYZER_SOURCES)
+    if os.path.exists(analyzer_path) and os.path.exists(stamp_path):
+        with open(stamp_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == source_hash:
+                return analyzer_path
+
+    command = ["dotnet", "build", os.path.join(project_dir, "static_analysis_cs.csproj"), "-c", "Debug", "--nologo"]
+    print(f"Building C# analyzer: {' '.join(command)}")
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        raise RuntimeError("未找到 dotnet 命令：构建 C# 分析器需要安装 .NET 8 SDK") from None
+    if result.returncode != 0 or not os.path.exists(analyzer_path):
+        tail = "\n".join((result.stdout + result.stderr).strip().splitlines()[-20:])
+        raise RuntimeError(f"C# 分析器构建失败（dotnet build {project_dir}）：\n{tail}")
+    with open(stamp_path, "w", encoding="utf-8") as f:
+        f.write(source_hash)
+    return analyzer_path
+
+
+class AnalyzerWorker:
+    """
+    常驻的 C# 分析器进程（static_analysis_cs --server）。
+
+    通过标准输入发送 JSON 请求，从标准输出逐行读取每个文件的分析结果，
+    避免每个文件都重新启动 .NET 运行时和 Roslyn。
+    """
+
+    def __init__(self, analyzer_path):
+        """
+        :param analyzer_path: C# 分析器的路径
+        """
+        self.analyzer_path = analyzer_path
+        self.process = None
+        self.stderr_tail = collections.deque(maxlen=50)  # 保留最近的错误输出，用于崩溃诊断
+
+    def start(self):
+        command = ["dotnet", self.analyzer_path, "--server"]
+        print(f"Starting analyzer worker: {' '.join(command)}")
+        start = time.perf_counter_ns()
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        tracing.complete("dotnet --server start", "process", start, worker=self.process.pid)
+        self.stderr_tail.clear()
+        # 持续读取标准错误，防止管道写满导致子进程阻塞
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            self.stderr_tail.append(line)
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def kill(self):
+        if self.process is None:
+            return
+        self.process.kill()
+        self.process.wait()
+        self.process = None
+
+    def analyze(self, target_files):
+        """
+        分析一批文件，按顺序逐个产出结果。
+
+        进程崩溃时，当前正在分析的文件记为失败，重启进程后继续分析剩余文件。
+
+        :param target_files: 要分析的 C# 文件路径列表；元素也可以是 {"file": 名称, "source": 源代码}，
+                             此时分析器直接分析 source 而不读取磁盘
+        :return: 生成器，产出 (文件路径, 分析输出, 错误信息)
+        """
+        for file, output, error, _ in self._run({}, target_files):
+            yield file, output, error
+
+    def analyze_project(self, project_name, target_files):
+        """
+        项目模式：把一批文件（通常是一个模块的全部文件）放进同一个编译中分析，
+        文件之间的类型引用可以解析，并运行分析器中注册的自定义规则。
+
+        :param project_name: 项目（模块）名称
+        :param target_files: 要分析的 C# 文件路径列表，格式同 analyze
+        :return: 生成器，产出 (文件路径, 分析输出, 错误信息, 诊断列表)；
+                 诊断为 {"id", "severity", "line", "column", "end_line", "end_column", "message"}，失败时为 None
+        """
+        yield from self._run({"project": project_name}, target_files)
+
+    def _run(self, request, target_files):
+        pending = list(target_files)
+        in_flight = False  # 已发送的请求中还有没有读取的结果
+        try:
+            while pending:
+                if not self.alive():
+                    self.start()
+                try:
+                    self.process.stdin.write(json.dumps({**request, "files": pending}, ensure_ascii=False) + "\n")
+                    self.process.stdin.flush()
+                except OSError:
+                    self.restart()
+                    continue
+                in_flight = True
+
+                # 结果按顺序逐个返回：两个结果之间的时间即为分析器处理该文件的耗时
+                start = time.perf_counter_ns()
+                while pending:
+                    expected = pending[0] if isinstance(pending[0], str) else pending[0]["file"]
+                    line = self.process.stdout.readline()
+                    if not line:
+                        # 进程异常退出：当前文件记为失败，其余文件交给重启后的进程
+                        self.process.wait()
+                        error = (f"Analyzer worker exited with code {self.process.returncode}\n"
+                                 + "".join(self.stderr_tail))
+                    else:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            record = None
+                        if isinstance(record, dict) and record.get("file") == expected:
+                            error = None
+                        else:
+                            # 无法解析或与请求的文件不对应：后续结果都不可信，当前文件记为失败并重启进程
+                            error = f"Unexpected analyzer output: {line.strip()[:200]}\n" + "".join(self.stderr_tail)
+                    if error is not None:
+                        pending.pop(0)
+                        in_flight = False
+                        self.restart()
+                        yield expected, None, error, None
+                        break
+
+                    pending.pop(0)
+                    in_flight = bool(pending)
+                    now = tracing.complete(expected, "file", start, worker=self.process.pid)
+                    tracing.observe("analyzer_latency", (now - start) / 1e9)
+                    start = now
+                    if record.get("error"):
+                        yield expected, None, record["error"], None
+                    else:
+                        yield expected, record.get("output") or "", "", record.get("diagnostics")
+        finally:
+            if in_flight:
+                # 调用方提前停止读取（break、异常、islice）：标准输出中还有本批次未读取的结果，
+                # 直接结束进程，避免下一个请求读到上一批的结果
+                self.kill()
+
+
+class AnalyzerPool:
+    """
+    分析器进程池，在整个 main() 运行期间保持若干常驻进程。
+    """
+
+    def __init__(self, analyzer_path, size=1):
+        """
+        :param analyzer_path: C# 分析器的路径
+        :param size: 常驻进程数量
+        """
+        self.analyzer_path = analyzer_path
+        self.size = size
+        self.workers = []
+        self.idle = queue.Queue()
+        for _ in range(size):
+            worker = AnalyzerWorker(analyzer_path)
+            self.workers.append(worker)
+            self.idle.put(worker)
+
+    @contextmanager
+    def worker(self):
+        """
+        借出一个空闲进程，用完后归还。
+        """
+        worker = self.idle.get()
+        try:
+            yield worker
+        finally:
+            self.idle.put(worker)
+
+    def analyze(self, target_files):
+        """
+        使用一个空闲进程分析一批文件。
+
+        :param target_files: 要分析的 C# 文件路径列表
+        :return: 生成器，产出 (文件路径, 分析输出, 错误信息)
+        """
+        with self.worker() as worker:
+            yield from worker.analyze(target_files)
+
+    def analyze_project(self, project_name, target_files):
+        """
+        使用一个空闲进程以项目模式分析一批文件，参见 AnalyzerWorker.analyze_project。
+        """
+        with self.worker() as worker:
+            yield from worker.analyze_project(project_name, target_files)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,415 @@
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+from mock_github import MockGitHubServer
+
+STAGES = ["platform_scan", "static_analysis", "commits", "issues", "fetch"]
+
+# scale 为 1 时各类合成数据的规模
+BASE_SIZES = {
+    "cs_files": 2000,
+    "commits": 20000,
+    "issues": 50000,
+    "fetch_items": 5000,
+}
+
+AUTHORS = [f"dev{i:02d}" for i in range(40)]
+LABELS = ["bug", "enhancement", "question", "documentation", "duplicate", "wontfix", "help wanted"]
+
+
+def corpus_sizes(scale):
+    return {name: max(1, int(size * scale)) for name, size in BASE_SIZES.items()}
+
+
+def generate_cs_tree(root, file_count, seed=0):
+    """
+    生成合成的 C# 源码树：包含条件编译指令、Windows / Unix 路径、平台相关的 using 和 os 调用，
+    每 200 个文件组成一个模块目录（与 SteamTools/src 的结构一致）。
+
+    :param root: 输出目录
+    :param file_count: 文件数
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    for index in range(file_count):
+        module = f"Module{index // 200:03d}"
+        folder = os.path.join(root, module, f"Feature{index % 7}")
+        os.makedirs(folder, exist_ok=True)
+        lines = ["using System;", "using System.IO;"]
+        if rng.random() < 0.2:
+            lines.append("using System.Windows.Forms;")
+        if rng.random() < 0.05:
+            lines.append("using Mono.Unix;")
+        lines += ["", f"namespace {module}.Feature{index % 7}", "{", f"    public class Class{index}", "    {"]
+        for method in range(rng.randint(5, 20)):
+            lines.append(f"        public int Method{method}(int value)")
+            lines.append("        {")
+            roll = rng.random()
+            if roll < 0.1:
+                lines += ["#if WINDOWS", "            var path = @\"C:\\Users\\Public\\config.json\";", "#endif"]
+            elif roll < 0.2:
+                lines += ["#if LINUX", "            var path = \"/usr/share/app/config.json\";", "#endif"]
+            elif roll < 0.25:
+                lines.append("            // os.environ and os.chmod are called from the python helper")
+            lines.append(f"            return value * {method} + {rng.randint(0, 1000)};")
+            lines.append("        }")
+        lines += ["    }", "}", ""]
+        with open(os.path.join(folder, f"Class{index}.cs"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def generate_git_repo(path, commit_count, seed=0):
+    """
+    用 git fast-import 生成一个包含 commit_count 个提交的本地仓库，提交位于 develop 分支。
+
+    :param path: 仓库路径
+    :param commit_count: 提交数
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    subprocess.run(["git", "init", "-q", path], check=True)
+    process = subprocess.Popen(["git", "-C", path, "fast-import", "--quiet"], stdin=subprocess.PIPE)
+    timestamp = int(datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    def data(text):
+        raw = text.encode("utf-8")
+        return b"data %d\n" % len(raw) + raw + b"\n"
+
+    for index in range(commit_count):
+        # 提交间隔服从指数分布，作者的活跃度不均匀
+        timestamp += int(rng.expovariate(1 / 3600)) + 1
+        author = AUTHORS[min(int(rng.expovariate(1 / 6)), len(AUTHORS) - 1)]
+        signature = f"{author} <{author}@example.com> {timestamp} +0800"
+        chunk = b"commit refs/heads/develop\nmark :%d\n" % (index + 1)
+        chunk += f"author {signature}\ncommitter {signature}\n".encode()
+        chunk += data(f"Change {index}\n\nUpdate module {index % 50}")
+        if index:
+            chunk += b"from :%d\n" % index
+        chunk += f"M 644 inline src/file{index % 500}.txt\n".encode() + data(f"revision {index}\n")
+        process.stdin.write(chunk)
+    process.stdin.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def generate_issue_dump(count, seed=0, pulls=False):
+    """
+    生成与 GitHub API 返回格式一致的合成 issue 或 pull request 记录。
+
+    :param count: 记录数
+    :param seed: 随机种子
+    :param pulls: 为 True 时生成 pull request（带 merged_at）
+    :return: 记录列表，按编号倒序
+    """
+    rng = random.Random(seed)
+    start = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for number in range(count, 0, -1):
+        created = start + timedelta(seconds=int(number / count * 5 * 365 * 86400))
+        closed = created + timedelta(seconds=int(rng.lognormvariate(11, 2))) if rng.random() < 0.8 else None
+        record = {
+            "number": number,
+            "title": f"Synthetic {'pull request' if pulls else 'issue'} {number}",
+            "state": "closed" if closed else "open",
+            "user": {"login": AUTHORS[rng.randrange(len(AUTHORS))]},
+            "labels": [{"name": label} for label in rng.sample(LABELS, rng.randint(0, 2))],
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updated_at": (closed or created).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "closed_at": closed.strftime("%Y-%m-%dT%H:%M:%SZ") if closed else None,
+            "body": "Steps to reproduce:\n" + "lorem ipsum " * rng.randint(5, 60),
+        }
+        if pulls:
+            record["merged_at"] = record["closed_at"] if closed and rng.random() < 0.7 else None
+        records.append(record)
+    return records
+
+
+def prepare_corpora(workdir, scale, seed=0):
+    """
+    生成（或复用已生成的）合成数据。
+
+    :param workdir: 工作目录
+    :param scale: 数据规模倍数
+    :param seed: 随机种子
+    :return: 各类数据的路径和规模
+    """
+    sizes = corpus_sizes(scale)
+    manifest = {"scale": scale, "seed": seed, "sizes": sizes}
+    manifest_path = os.path.join(workdir, "corpus.json")
+    corpora = {
+        "cs_root": os.path.join(workdir, "cs"),
+        "repo": os.path.join(workdir, "repo"),
+        "issues": os.path.join(workdir, "issue_info.json"),
+        "pulls": os.path.join(workdir, "pr_info.json"),
+        "fetch_issues": os.path.join(workdir, "fetch_issues.json"),
+        "fetch_pulls": os.path.join(workdir, "fetch_pulls.json"),
+        "sizes": sizes,
+    }
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                return corpora
+
+    print(f"Generating corpora in {workdir}: {sizes}")
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    generate_cs_tree(corpora["cs_root"], sizes["cs_files"], seed)
+    generate_git_repo(corpora["repo"], sizes["commits"], seed)
+    for key, count, pulls in (("issues", sizes["issues"], False), ("pulls", sizes["issues"] // 2, True),
+                              ("fetch_issues", sizes["fetch_items"], False),
+                              ("fetch_pulls", sizes["fetch_items"] // 2, True)):
+        with open(corpora[key], "w", encoding="utf-8") as f:
+            json.dump(generate_issue_dump(count, seed, pulls), f, ensure_ascii=False, indent=4)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return corpora
+
+
+def reset_peak_rss():
+    """
+    把当前进程的峰值内存（VmHWM）重置为当前占用，只统计此后的峰值（Linux）。
+
+    ru_maxrss 在 fork 和 exec 之后仍保留父进程的峰值，不能用来测量单个阶段；
+    VmHWM 属于当前进程的地址空间，exec 之后重新计算，并且可以通过 clear_refs 重置。
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """
+    :return: 当前进程的峰值内存（MB）；Linux 上读取 VmHWM，其他系统退回 ru_maxrss，都不支持时返回 None
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def children_peak_rss_mb():
+    """
+    :return: 已结束的子进程（进程池、分析器等）中最大的峰值内存（MB）
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def run_stage(stage, corpora, options):
+    """
+    在独立的子进程中运行一个阶段，返回耗时、处理量和峰值内存。
+
+    :param stage: 阶段名称
+    :param corpora: prepare_corpora 的返回值
+    :param options: 运行参数（jobs、analyzer、font、fetch_latency）
+    :return: 测量结果字典；阶段无法运行时返回 {"skipped": 原因}
+    """
+    run_dir = os.path.join(os.path.dirname(corpora["cs_root"]), "runs", stage)
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(os.path.join(run_dir, "results"))
+    os.chdir(run_dir)  # 各阶段的 ./data、./results 等相对路径都落在运行目录中
+    jobs = options["jobs"]
+    sizes = corpora["sizes"]
+
+    server = None
+    if stage == "fetch":
+        # 模拟服务器和它的数据只在 fetch 阶段的子进程中创建，不影响其他阶段的内存测量
+        with open(corpora["fetch_issues"], "r", encoding="utf-8") as f:
+            issues = json.load(f)
+        with open(corpora["fetch_pulls"], "r", encoding="utf-8") as f:
+            pulls = json.load(f)
+        server = MockGitHubServer(issues, pulls, latency=options["fetch_latency"]).start()
+        del issues, pulls
+
+    reset_peak_rss()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if stage == "platform_scan":
+            from platform_compatibility_analysis import scan_all_cs_files
+            scan_all_cs_files(corpora["cs_root"], "output.txt", jobs=jobs)
+            items = sizes["cs_files"]
+        elif stage == "static_analysis":
+            analyzer = options["analyzer"]
+            if not analyzer or not os.path.exists(analyzer) or not os.path.exists(options["font"]):
+                return {"skipped": "analyzer or font not found"}
+            from analyzer_worker import AnalyzerPool
+            from static_analysis import analyze_files, analyze_module, find_module_cs_files
+            # 与 static_analysis.main 相同：所有模块的文件合并为一个队列分给 jobs 个分析器进程
+            modules = sorted(os.path.join(corpora["cs_root"], module) for module in os.listdir(corpora["cs_root"]))
+            module_files = [find_module_cs_files(module) for module in modules]
+            with AnalyzerPool(analyzer, size=jobs) as pool:
+                analyzed = analyze_files(analyzer, [f for files in module_files for f in files], pool, jobs)
+                items = sum(analyze_module(analyzer, module, run_dir, options["font"], pool,
+                                           analyzed=itertools.islice(analyzed, len(files)))
+                            for module, files in zip(modules, module_files))
+        elif stage == "commits":
+            from commit_analysis import analyze_commits
+            analyze_commits(None, corpora["repo"], "./data")
+            items = sizes["commits"]
+        elif stage == "issues":
+            from issue_pr_analysis import analyze_issue_resolution
+            analyze_issue_resolution(corpora["issues"])
+            items = sizes["issues"]
+        elif stage == "fetch":
+            from issue_pr_get import get_issues_and_prs
+            try:
+                issues, prs = get_issues_and_prs("owner", "repo", server.base_url, jobs)
+            finally:
+                server.stop()
+            items = len(issues) + len(prs)
+        else:
+            raise ValueError(f"Unknown stage: {stage}")
+        seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 3),
+        "items": items,
+        "items_per_second": round(items / seconds, 1) if seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": children_peak_rss_mb(),
+    }
+
+
+def stage_process(stage, corpora, options, connection):
+    """
+    子进程入口：运行阶段并通过管道返回结果，出错时返回 {"error": 异常信息}。
+    """
+    try:
+        result = run_stage(stage, corpora, options)
+    except Exception:
+        result = {"error": traceback.format_exc()}
+    connection.send(result)
+    connection.close()
+
+
+def current_revision():
+    result = subprocess.run(["git", "-C", os.path.dirname(os.path.abspath(__file__)), "rev-parse", "--short", "HEAD"],
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def load_history(results_path):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_comparison(run, previous, threshold):
+    """
+    输出本次结果，并与上一次相同规模的结果比较，耗时增加超过 threshold 的阶段标记为退化。
+    """
+    print(f"\n{'stage':<18}{'seconds':>10}{'items/s':>12}{'peak MB':>10}  change")
+    for stage, result in run["stages"].items():
+        if "skipped" in result:
+            print(f"{stage:<18}  skipped: {result['skipped']}")
+            continue
+        if "error" in result:
+            print(f"{stage:<18}  failed:\n{result['error']}")
+            continue
+        change = ""
+        before = (previous or {}).get("stages", {}).get(stage, {})
+        if before.get("seconds"):
+            ratio = result["seconds"] / before["seconds"] - 1
+            change = f"{ratio:+.1%}" + (" REGRESSION" if ratio > threshold else "")
+        peak = "-" if result["peak_rss_mb"] is None else result["peak_rss_mb"]
+        print(f"{stage:<18}{result['seconds']:>10.3f}{result['items_per_second'] or 0:>12.1f}{peak:>10}  {change}")
+    if previous is not None:
+        print(f"\nCompared with {previous['time']} ({previous.get('revision')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用合成数据对各分析阶段进行离线基准测试")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"要运行的阶段，逗号分隔（{','.join(STAGES)}）")
+    parser.add_argument("--scale", type=float, default=1.0, help="数据规模倍数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="各阶段使用的并发数，0 表示全部 CPU 核心")
+    parser.add_argument("--workdir", default="./benchmarks", help="合成数据和运行输出目录")
+    parser.add_argument("--results", default="./results/benchmarks.jsonl", help="基准结果记录文件")
+    parser.add_argument("--threshold", type=float, default=0.1, help="耗时增加超过该比例时视为退化")
+    parser.add_argument("--analyzer", help="C# 分析器 DLL 路径，默认与 static_analysis.py 相同")
+    parser.add_argument("--font", help="报告字体路径，默认为 src/msyh.ttc")
+    parser.add_argument("--fetch-latency", type=float, default=0.01, help="模拟 GitHub API 的请求延迟（秒）")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    workdir = os.path.abspath(args.workdir)
+    results_path = os.path.abspath(args.results)
+    corpora = prepare_corpora(workdir, args.scale, args.seed)
+    options = {
+        "jobs": jobs,
+        "analyzer": os.path.abspath(args.analyzer) if args.analyzer else None,
+        "font": os.path.abspath(args.font) if args.font else os.path.join(script_dir, "msyh.ttc"),
+        "fetch_latency": args.fetch_latency,
+    }
+
+    if options["analyzer"] is None and "static_analysis" in stages:
+        # 与 static_analysis.py 相同：使用按当前源码构建的分析器，无法构建时跳过该阶段
+        from analyzer_worker import ensure_analyzer
+        try:
+            options["analyzer"] = ensure_analyzer()
+        except RuntimeError as e:
+            print(e)
+
+    run = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": current_revision(),
+        "scale": args.scale,
+        "jobs": jobs,
+        "stages": {},
+    }
+    # 每个阶段在新的子进程中运行，峰值内存互不影响；阶段内部还可以再启动进程池，因此不使用（守护进程的）Pool
+    context = multiprocessing.get_context("spawn")
+    for stage in stages:
+        print(f"Running {stage}...")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=stage_process, args=(stage, corpora, options, sender))
+        process.start()
+        sender.close()
+        try:
+            run["stages"][stage] = receiver.recv()
+        except EOFError:
+            run["stages"][stage] = {"error": f"stage process exited with code {process.exitcode}"}
+        process.join()
+
+    history = [record for record in load_history(results_path)
+               if record["scale"] == args.scale and record["jobs"] == jobs]
+    print_comparison(run, history[-1] if history else None, args.threshold)
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    print(f"Results appended to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
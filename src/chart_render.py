@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")  # 非交互式后端，服务器上无需显示环境，也不会阻塞
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+plt.rcParams["font.sans-serif"] = ["SimHei"]  # 使用黑体
+plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+
+# 绘图代码变化时修改此版本号，使已有图片的指纹失效
+RENDERER_VERSION = "1"
+FINGERPRINT_KEY = "Fingerprint"
+
+# 日期序列超过该点数时自动按周 / 月 / 年合并
+MAX_SERIES_POINTS = 1000
+
+
+def chart_fingerprint(spec):
+    """
+    :param spec: 图表描述（可 JSON 序列化的聚合数据）
+    :return: 图表描述和绘图代码版本的哈希
+    """
+    data = json.dumps(spec, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{RENDERER_VERSION}:{data}".encode()).hexdigest()
+
+
+def read_png_fingerprint(path):
+    """
+    读取 PNG 文本块中保存的指纹，不解码图像数据。
+
+    :param path: PNG 文件路径
+    :return: 指纹；文件不存在或没有指纹时返回 None
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(8) != b"\x89PNG\r\n\x1a\n":
+                return None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                length, chunk_type = struct.unpack(">I4s", header)
+                if chunk_type == b"IDAT":
+                    # matplotlib 把文本块写在图像数据之前
+                    return None
+                data = f.read(length)
+                f.read(4)  # CRC
+                if chunk_type == b"tEXt":
+                    key, _, value = data.partition(b"\0")
+                    if key.decode("latin-1") == FINGERPRINT_KEY:
+                        return value.decode("latin-1")
+    except OSError:
+        return None
+
+
+def bin_daily_counts(dates, counts, max_points=MAX_SERIES_POINTS):
+    """
+    按日期统计的序列点数过多时，依次尝试按周、月、年合并，直到点数不超过 max_points。
+
+    :param dates: 日期（YYYY-MM-DD 字符串或 datetime64）
+    :param counts: 对应的数量
+    :param max_points: 最多保留的点数
+    :return: (各区间起始日期的字符串列表, 各区间的数量列表, 区间单位 "D" / "W" / "M" / "Y")
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    counts = np.asarray(counts)
+    for unit in ("D", "W", "M", "Y"):
+        bins, inverse = np.unique(days.astype(f"datetime64[{unit}]"), return_inverse=True)
+        if len(bins) <= max_points or unit == "Y":
+            sums = np.bincount(inverse, weights=counts, minlength=len(bins))
+            labels = [str(day) for day in bins.astype("datetime64[D]")]
+            return labels, [int(value) for value in sums], unit
+
+
+def _render_bar(spec):
+    plt.bar(spec["x"], spec["y"])
+    plt.xticks(rotation=45, ha="right")
+
+
+def _render_line(spec):
+    for series in spec["series"]:
+        x = np.array(series["x"], dtype="datetime64[D]") if spec.get("dates") else series["x"]
+        plt.plot(x, series["y"], marker=spec.get("marker"), label=series.get("label"))
+    if spec.get("legend"):
+        plt.legend()
+    plt.xticks(rotation=45, ha="right")
+
+
+def _render_heatmap(spec):
+    plt.imshow(np.array(spec["matrix"]), aspect="auto", cmap=spec.get("cmap", "Greens"))
+    plt.colorbar(label=spec.get("colorbar"))
+    plt.xticks(range(len(spec["xticks"])), spec["xticks"])
+    plt.yticks(range(len(spec["yticks"])), spec["yticks"])
+
+
+def _render_histogram(spec):
+    plt.stairs(spec["counts"], spec["edges"])
+    if spec.get("xscale"):
+        plt.xscale(spec["xscale"])
+
+
+RENDERERS = {
+    "bar": _render_bar,
+    "line": _render_line,
+    "heatmap": _render_heatmap,
+    "histogram": _render_histogram,
+}
+
+
+def render_chart(path, spec, fingerprint=None):
+    """
+    绘制一张图表并保存为 PNG，指纹写入 PNG 的文本块。
+
+    :param path: 输出路径
+    :param spec: 图表描述：kind、title、xlabel、ylabel、figsize 以及各类图表需要的数据
+    :param fingerprint: 图表指纹，默认根据 spec 计算
+    :return: 输出路径
+    """
+    fig = plt.figure(figsize=spec.get("figsize", (10, 6)))
+    try:
+        RENDERERS[spec["kind"]](spec)
+        plt.xlabel(spec.get("xlabel", ""))
+        plt.ylabel(spec.get("ylabel", ""))
+        plt.title(spec.get("title", ""))
+        plt.tight_layout()
+        tmp_path = path + ".tmp.png"
+        fig.savefig(tmp_path, metadata={FINGERPRINT_KEY: fingerprint or chart_fingerprint(spec)})
+        os.replace(tmp_path, path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def render_charts(charts, jobs=None):
+    """
+    批量绘制图表：指纹与已有 PNG 相同的图表直接跳过，其余的在进程池中并行绘制。
+
+    :param charts: [(输出路径, 图表描述)]
+    :param jobs: 进程数，默认为需要绘制的图表数与 CPU 核心数中较小的一个
+    :return: (重新绘制的路径列表, 跳过的路径列表)
+    """
+    pending = []
+    skipped = []
+    for path, spec in charts:
+        fingerprint = chart_fingerprint(spec)
+        if read_png_fingerprint(path) == fingerprint:
+            skipped.append(path)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            pending.append((path, spec, fingerprint))
+
+    if len(pending) > 1 and (jobs is None or jobs > 1):
+        jobs = min(len(pending), jobs or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rendered = list(executor.map(render_chart, *zip(*pending)))
+    else:
+        rendered = [render_chart(*chart) for chart in pending]
+
+    print(f"Charts: {len(rendered)} rendered, {len(skipped)} unchanged")
+    return rendered, skipped
@@ -0,0 +1,215 @@
+import argparse
+import os
+
+import numpy as np
+
+import data_store
+from chart_render import render_charts
+
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+class ActivityDataset:
+    """
+    以 NumPy 数组保存的提交数据：提交时间（秒级时间戳，升序）和作者编号。
+
+    所有统计视图都从同一份数组向量化计算，不再逐条遍历 datetime 对象。
+    """
+
+    def __init__(self, timestamps, author_ids, authors):
+        """
+        :param timestamps: 提交时间，int64 秒级时间戳
+        :param author_ids: 每个提交的作者编号，对应 authors 中的下标
+        :param authors: 作者名数组
+        """
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)[order]
+        self.author_ids = np.asarray(author_ids, dtype=np.int32)[order]
+        self.authors = np.asarray(authors)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        :param records: 提交记录（与 commit_info.json 中的结构相同）的可迭代对象
+        :return: ActivityDataset
+        """
+        dates = []
+        names = []
+        for record in records:
+            dates.append(record["date"])
+            names.append(record["author"])
+        timestamps = np.array(dates, dtype="datetime64[s]").astype(np.int64)
+        authors, author_ids = np.unique(np.array(names, dtype=str), return_inverse=True)
+        return cls(timestamps, author_ids, authors)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: commit_info.json / commit_info.jsonl，或本地数据库（.db）
+        :return: ActivityDataset
+        """
+        if path.endswith(".db"):
+            store = data_store.open_store(path)
+            try:
+                return cls.from_records(data_store.query_commits(store))
+            finally:
+                store.close()
+        return cls.from_records(data_store.iter_json_records(path))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def hour_weekday_heatmap(self):
+        """
+        :return: 7×24 数组，行为星期（周一为 0），列为小时
+        """
+        days = self.timestamps // SECONDS_PER_DAY
+        hours = (self.timestamps % SECONDS_PER_DAY) // 3600
+        weekdays = (days + 3) % 7  # 1970-01-01 是星期四
+        return np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+
+    def daily_counts(self):
+        """
+        :return: (日期数组 datetime64[D], 每日提交次数)，包含没有提交的日期
+        """
+        if not len(self):
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+        days = self.timestamps // SECONDS_PER_DAY
+        counts = np.bincount(days - days[0])
+        return np.arange(days[0], days[0] + len(counts)).astype("datetime64[D]"), counts
+
+    def rolling_throughput(self, window):
+        """
+        :param window: 窗口天数，如 7 或 30
+        :return: (日期数组, 截至当天的 window 天内提交次数)
+        """
+        dates, counts = self.daily_counts()
+        cumulative = np.cumsum(counts)
+        rolling = cumulative.copy()
+        rolling[window:] -= cumulative[:-window]
+        return dates, rolling
+
+    def author_activity(self, top=10):
+        """
+        每个作者按月的提交次数。
+
+        :param top: 只保留提交最多的若干名作者
+        :return: (月份数组 datetime64[M], 作者名数组, 作者×月份的提交次数矩阵)
+        """
+        months = self.timestamps.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        if not len(months):
+            return np.array([], dtype="datetime64[M]"), self.authors[:0], np.zeros((0, 0), dtype=np.int64)
+        first = months[0]
+        month_count = int(months[-1] - first) + 1
+        matrix = np.bincount(self.author_ids.astype(np.int64) * month_count + (months - first),
+                             minlength=len(self.authors) * month_count).reshape(len(self.authors), month_count)
+        selected = np.argsort(-matrix.sum(axis=1), kind="stable")[:top]
+        return np.arange(first, first + month_count).astype("datetime64[M]"), self.authors[selected], matrix[selected]
+
+    def next_commit_gaps(self, same_author=False):
+        """
+        相邻提交之间的间隔。
+
+        :param same_author: 为 True 时计算同一作者相邻两次提交的间隔
+        :return: 间隔秒数数组
+        """
+        if not same_author:
+            return np.diff(self.timestamps)
+        order = np.lexsort((self.timestamps, self.author_ids))
+        timestamps = self.timestamps[order]
+        author_ids = self.author_ids[order]
+        gaps = np.diff(timestamps)
+        return gaps[author_ids[1:] == author_ids[:-1]]
+
+
+def gap_distribution(gaps, bins=30):
+    """
+    :param gaps: 间隔秒数数组
+    :param bins: 直方图的对数分箱数量
+    :return: (分箱边界（小时）, 各分箱的数量, {"p50": .., "p90": .., "p99": ..}（小时）)
+    """
+    hours = gaps / 3600
+    if not len(hours):
+        return np.array([]), np.array([], dtype=np.int64), {}
+    # 分箱从 1 分钟开始，更短的间隔计入第一个分箱
+    lower = 1 / 60
+    edges = np.logspace(np.log10(lower), np.log10(max(hours.max(), lower) * 1.001), bins + 1)
+    counts, edges = np.histogram(np.clip(hours, lower, None), bins=edges)
+    quantiles = dict(zip(("p50", "p90", "p99"), np.percentile(hours, [50, 90, 99]).tolist()))
+    return edges, counts, quantiles
+
+
+def plot_activity(dataset, output_dir="./results"):
+    """
+    绘制提交时间热力图、作者月度活跃度、滚动提交量和提交间隔分布。
+
+    :param dataset: ActivityDataset
+    :param output_dir: 图片保存目录
+    """
+    months, authors, matrix = dataset.author_activity()
+    month_labels = [str(month) for month in months.astype("datetime64[D]")]
+    rolling = [dataset.rolling_throughput(window) for window in (7, 30)]
+    edges, counts, quantiles = gap_distribution(dataset.next_commit_gaps())
+
+    render_charts([
+        # 小时×星期热力图
+        (os.path.join(output_dir, "commit_hour_weekday_heatmap.png"), {
+            "kind": "heatmap",
+            "title": "提交时间热力图",
+            "xlabel": "小时",
+            "figsize": (12, 4),
+            "matrix": dataset.hour_weekday_heatmap().tolist(),
+            "xticks": list(range(24)),
+            "yticks": WEEKDAYS,
+            "colorbar": "提交次数",
+        }),
+        # 作者月度活跃度
+        (os.path.join(output_dir, "author_monthly_activity.png"), {
+            "kind": "line",
+            "title": "主要作者月度提交次数",
+            "xlabel": "月份",
+            "ylabel": "提交次数",
+            "figsize": (12, 6),
+            "dates": True,
+            "legend": True,
+            "series": [{"label": str(author), "x": month_labels, "y": row.tolist()}
+                       for author, row in zip(authors, matrix)],
+        }),
+        # 7 天 / 30 天滚动提交量
+        (os.path.join(output_dir, "commit_rolling_throughput.png"), {
+            "kind": "line",
+            "title": "滚动提交量",
+            "xlabel": "日期",
+            "ylabel": "提交次数",
+            "figsize": (12, 6),
+            "dates": True,
+            "legend": True,
+            "series": [{"label": f"{window} 天", "x": [str(date) for date in dates], "y": values.tolist()}
+                       for window, (dates, values) in zip((7, 30), rolling)],
+        }),
+        # 提交间隔分布
+        (os.path.join(output_dir, "commit_gap_distribution.png"), {
+            "kind": "histogram",
+            "title": "提交间隔分布",
+            "xlabel": "距下一次提交的间隔（小时）",
+            "ylabel": "提交次数",
+            "xscale": "log",
+            "edges": edges.tolist(),
+            "counts": counts.tolist(),
+        }),
+    ])
+
+    print(f"Commits: {len(dataset)}, authors: {len(dataset.authors)}")
+    for name, value in quantiles.items():
+        print(f"提交间隔 {name}: {value:.2f} 小时")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提交活跃度分析：时间热力图、作者活跃度、滚动提交量和提交间隔")
+    parser.add_argument("input", nargs="?", default="./data/commit_info.json",
+                        help="提交数据：commit_info.json / commit_info.jsonl 或本地数据库 .db")
+    parser.add_argument("-o", "--output", default="./results", help="图片保存目录")
+    args = parser.parse_args()
+
+    plot_activity(ActivityDataset.load(args.input), args.output)
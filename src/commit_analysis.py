@@ -1,80 +1,256 @@
 import git
-import matplotlib.pyplot as plt
 import os
 import json
+import argparse
+import atexit
+import subprocess
 from collections import Counter
 from datetime import datetime
 
+import data_store
+import tracing
+from chart_render import bin_daily_counts, render_charts
 
-plt.rcParams["font.sans-serif"] = ["SimHei"]  # 使用黑体
-plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+# git log 的记录格式：字段之间用 \x1f 分隔，记录之间用 \x1e 分隔
+# 依次为：哈希、作者名、作者邮箱、提交时间戳、完整提交信息
+GIT_LOG_FORMAT = "%H%x1f%an%x1f%ae%x1f%ct%x1f%B%x1e"
 
 
-def analyze_commits(repo_url, clone_dir, data_dir):
-    # 克隆仓库
+def iter_commits(repo_dir, rev="develop", reverse=False):
+    """
+    流式读取 git log 输出，逐个产出提交记录，不为每个提交创建 GitPython 对象。
+
+    :param repo_dir: 本地仓库路径
+    :param rev: 要遍历的分支或修订范围
+    :param reverse: 为 True 时按从旧到新的顺序产出
+    :return: 生成器，产出与 commit_info.json 中相同结构的提交记录
+    """
+    process = subprocess.Popen(
+        ["git", "-C", repo_dir, "log", f"--format={GIT_LOG_FORMAT}"] + (["--reverse"] if reverse else []) + [rev],
+        stdout=subprocess.PIPE,
+    )
+    buffer = b""
+    for chunk in iter(lambda: process.stdout.read(1 << 16), b""):
+        buffer += chunk
+        *records, buffer = buffer.split(b"\x1e")
+        for record in records:
+            yield parse_commit_record(record)
+    process.stdout.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def parse_commit_record(record):
+    """
+    解析一条 GIT_LOG_FORMAT 格式的记录。
+
+    :param record: 原始记录（bytes）
+    :return: 提交记录字典
+    """
+    commit_hash, author, email, timestamp, message = record.decode("utf-8", errors="replace").split("\x1f")
+    return {
+        "author": author,
+        "email": email,
+        "date": datetime.fromtimestamp(int(timestamp)).isoformat(),
+        "message": message.strip(),
+        "hash": commit_hash.strip(),  # 上一条记录后的换行符会出现在哈希前
+    }
+
+
+def git_rev_parse(repo_dir, rev):
+    return subprocess.run(["git", "-C", repo_dir, "rev-parse", "--verify", "-q", f"{rev}^{{commit}}"],
+                          capture_output=True, text=True).stdout.strip() or None
+
+
+def is_ancestor(repo_dir, ancestor, descendant):
+    return subprocess.run(["git", "-C", repo_dir, "merge-base", "--is-ancestor", ancestor, descendant],
+                          capture_output=True).returncode == 0
+
+
+def write_json_atomic(data, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def sync_commits(repo_url, clone_dir, data_dir, rev="origin/develop", store=None):
+    """
+    增量同步提交记录。
+
+    记录上次处理到的提交（head）以及作者、日期统计，每次只拉取远端并处理新增的提交，
+    追加到 data/commit_info.jsonl（每行一个提交，按时间从旧到新）。
+    上次的 head 不再是新 head 的祖先时（强制推送、历史被改写），回退为完整重建。
+
+    :param repo_url: 仓库地址
+    :param clone_dir: 本地克隆路径
+    :param data_dir: 数据保存路径
+    :param rev: 要同步的分支
+    :param store: 本地数据库连接（data_store.open_store），新增的提交会同时写入数据库
+    :return: (作者提交次数 Counter, 每日提交次数 Counter)
+    """
+    state_path = os.path.join(data_dir, "commit_sync_state.json")
+    dataset_path = os.path.join(data_dir, "commit_info.jsonl")
+    os.makedirs(data_dir, exist_ok=True)
+
     if not os.path.exists(clone_dir):
-        repo = git.Repo.clone_from(repo_url, clone_dir)
+        git.Repo.clone_from(repo_url, clone_dir)
+    else:
+        subprocess.run(["git", "-C", clone_dir, "fetch", "--prune", "origin"], check=True)
+
+    head = git_rev_parse(clone_dir, rev)
+    if head is None:
+        raise ValueError(f"无法解析修订：{rev}")
+
+    state = None
+    if os.path.exists(state_path) and os.path.exists(dataset_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("rev") != rev or not is_ancestor(clone_dir, state["head"], head):
+            print(f"历史已被改写（{state['head'][:12]} 不是 {head[:12]} 的祖先），完整重建")
+            state = None
+
+    if state is None:
+        state = {"rev": rev, "head": None, "count": 0, "dataset_size": 0, "author_counts": {}, "date_counts": {}}
+        commit_range = head
+        if store is not None:
+            data_store.clear_commits(store)
+    elif state["head"] == head:
+        print(f"没有新的提交（{head[:12]}）")
+        return Counter(state["author_counts"]), Counter(state["date_counts"])
     else:
-        repo = git.Repo(clone_dir)
+        commit_range = f"{state['head']}..{head}"
+
+    author_counts = Counter(state["author_counts"])
+    date_counts = Counter(state["date_counts"])
+
+    # 上次运行若在写入状态前中断，截掉多写的部分，避免重复记录
+    with open(dataset_path, "ab") as f:
+        f.truncate(state["dataset_size"])
+    new_count = 0
+    records = iter_commits(clone_dir, commit_range, reverse=True)
+    if store is not None:
+        records = data_store.tee_into(store, records, data_store.upsert_commits)
+    with open(dataset_path, "a", encoding="utf-8", newline="\n") as f:
+        for commit_info in records:
+            author_counts[commit_info["author"]] += 1
+            date_counts[commit_info["date"][:10]] += 1
+            f.write(json.dumps(commit_info, ensure_ascii=False) + "\n")
+            new_count += 1
+        dataset_size = f.tell()
+
+    state.update({
+        "head": head,
+        "count": state["count"] + new_count,
+        "dataset_size": dataset_size,
+        "author_counts": dict(author_counts),
+        "date_counts": dict(date_counts),
+    })
+    write_json_atomic(state, state_path)
+    print(f"新增 {new_count} 个提交，共 {state['count']} 个（{head[:12]}）")
+    return author_counts, date_counts
+
+
+def analyze_commits(repo_url, clone_dir, data_dir, incremental=False, store_path=None):
+    """
+    统计提交作者和提交时间并绘图。
+
+    :param repo_url: 仓库地址
+    :param clone_dir: 本地克隆路径
+    :param data_dir: 数据保存路径
+    :param incremental: 为 True 时使用 sync_commits 增量同步，否则完整遍历 develop 分支并重写 commit_info.json
+    :param store_path: 本地数据库路径，提供时提交记录同时写入数据库，便于按作者、日期查询
+    """
+    store = data_store.open_store(store_path) if store_path else None
+    if incremental:
+        with tracing.span("sync commits"):
+            author_counts, commit_date_counts = sync_commits(repo_url, clone_dir, data_dir, store=store)
+        plot_commit_charts(author_counts, commit_date_counts)
+        return
+
+    # 克隆仓库
+    if not os.path.exists(clone_dir):
+        with tracing.span("clone"):
+            git.Repo.clone_from(repo_url, clone_dir)
 
-    # 获取提交历史
-    commits = list(repo.iter_commits("develop"))  # 获取 develop 分支的提交记录
+    author_counts = Counter()
+    commit_date_counts = Counter()
 
-    # 分析作者的提交次数
-    authors = [commit.author.name for commit in commits]
-    author_counts = Counter(authors)
+    records = iter_commits(clone_dir, "develop")
+    if store is not None:
+        data_store.clear_commits(store)
+        records = data_store.tee_into(store, records, data_store.upsert_commits)
 
-    # 分析每个提交的时间
-    commit_times = [datetime.fromtimestamp(commit.committed_date) for commit in commits]
+    # 一遍遍历 develop 分支的提交记录：同时统计作者、日期并写出 JSON，内存占用与提交数无关
+    os.makedirs(data_dir, exist_ok=True)
+    dataset_path = os.path.join(data_dir, "commit_info.json")
+    with tracing.span("read commits"), open(dataset_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for index, commit_info in enumerate(records):
+            author_counts[commit_info["author"]] += 1
+            commit_date_counts[commit_info["date"][:10]] += 1
 
+            # 与 json.dump(..., indent=4) 的列表格式保持一致
+            record = json.dumps(commit_info, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+            f.write(("," if index else "") + "\n    " + record)
+        f.write("\n]" if author_counts else "]")
+    tracing.count_bytes("written", os.path.getsize(dataset_path))
+
+    plot_commit_charts(author_counts, commit_date_counts)
+
+
+def plot_commit_charts(author_counts, commit_date_counts, output_dir="./results"):
+    """
+    输出统计结果并绘制作者提交次数和提交时间分布图。
+
+    图表由 chart_render 在后台进程中绘制，数据没有变化时不重新绘制。
+
+    :param author_counts: 作者提交次数
+    :param commit_date_counts: 每日提交次数，键为 YYYY-MM-DD 字符串
+    :param output_dir: 图片保存目录
+    """
     # 输出提交作者统计
     print("提交作者及其提交次数:")
     for author, count in author_counts.items():
         print(f"{author}: {count} 次")
 
-    # 画出作者提交次数的分布图
-    plt.figure(figsize=(10, 6))
-    plt.bar(author_counts.keys(), author_counts.values())
-    plt.xlabel("作者")
-    plt.ylabel("提交次数")
-    plt.title("提交作者提交次数分布")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    plt.savefig("./results/author_commit_counts.png")
-    plt.show()
-
-    # 画出提交时间分布图
-    commit_dates = [commit_time.date() for commit_time in commit_times]
-    commit_date_counts = Counter(commit_dates)
-
-    for date, count in commit_date_counts.items():
+    # 输出提交时间分布（按日期排序）
+    commit_date_counts = sorted(commit_date_counts.items())
+    for date, count in commit_date_counts:
         print(f"{date}: {count} 次")
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(commit_date_counts.keys(), commit_date_counts.values(), marker="o")
-    plt.xlabel("日期")
-    plt.ylabel("提交次数")
-    plt.title("提交时间分布")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    plt.savefig("./results/commit_time_distribution.png")  # 保存图片
-    plt.show()
-
-    # 将提交信息保存为 JSON 文件
-    commit_data = []
-    for commit in commits:
-        commit_info = {
-            "author": commit.author.name,
-            "email": commit.author.email,
-            "date": datetime.fromtimestamp(commit.committed_date).isoformat(),
-            "message": commit.message.strip(),
-            "hash": commit.hexsha,
-        }
-        commit_data.append(commit_info)
-
-    os.makedirs("./data", exist_ok=True)
-    with open("./data/commit_info.json", "w", encoding="utf-8") as f:
-        json.dump(commit_data, f, ensure_ascii=False, indent=4)
+    # 日期过多时按周 / 月 / 年合并
+    dates, counts, unit = bin_daily_counts([date for date, _ in commit_date_counts],
+                                           [count for _, count in commit_date_counts])
+    unit_name = {"D": "", "W": "（按周）", "M": "（按月）", "Y": "（按年）"}[unit]
+
+    with tracing.span("render charts"):
+        render_charts(commit_chart_specs(author_counts, dates, counts, unit_name, output_dir))
+
+
+def commit_chart_specs(author_counts, dates, counts, unit_name, output_dir):
+    """
+    :return: [(输出路径, 图表描述)]，交给 render_charts 绘制
+    """
+    return [
+        (os.path.join(output_dir, "author_commit_counts.png"), {
+            "kind": "bar",
+            "title": "提交作者提交次数分布",
+            "xlabel": "作者",
+            "ylabel": "提交次数",
+            "x": list(author_counts.keys()),
+            "y": list(author_counts.values()),
+        }),
+        (os.path.join(output_dir, "commit_time_distribution.png"), {
+            "kind": "line",
+            "title": "提交时间分布",
+            "xlabel": "日期",
+            "ylabel": f"提交次数{unit_name}",
+            "dates": True,
+            "marker": "o",
+            "series": [{"x": dates, "y": counts}],
+        }),
+    ]
 
 
 if __name__ == "__main__":
@@ -82,4 +258,15 @@ if __name__ == "__main__":
     clone_dir = "SteamTools"
     data_dir = "./data"
 
-    analyze_commits(repo_url, clone_dir, data_dir)
+    parser = argparse.ArgumentParser(description="分析 SteamTools 仓库的提交历史")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：拉取远端后只处理上次运行以来的新提交，追加到 data/commit_info.jsonl")
+    parser.add_argument("--store", nargs="?", const=data_store.DEFAULT_STORE_PATH,
+                        help="同时把提交记录写入本地 SQLite 数据库（默认 ./data/analysis.db）")
+    parser.add_argument("--trace", help="记录各阶段的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
+    analyze_commits(repo_url, clone_dir, data_dir, incremental=args.incremental, store_path=args.store)
@@ -0,0 +1,365 @@
+import argparse
+import atexit
+import csv
+import functools
+import json
+import os
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import tracing
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join("data", "churn_shards")
+DEFAULT_OUTPUT_DIR = os.path.join("results", "churn")
+
+# 每个提交以 \x1e 开头的一行：哈希、作者名、提交时间戳；其后是 --numstat 的各行
+GIT_LOG_FORMAT = "%x1e%H%x1f%an%x1f%ct"
+
+PERIOD_KEYS = {
+    "month": lambda month: month,
+    "quarter": lambda month: f"{month[:4]}-Q{(int(month[5:7]) - 1) // 3 + 1}",
+    "year": lambda month: month[:4],
+}
+
+
+def shard_boundaries(repo_dir, rev="develop", shard_size=500):
+    """
+    沿第一父提交链每隔 shard_size 个提交取一个边界，把历史划分为修订范围。
+
+    范围 b[i-1]..b[i] 包含从 b[i] 可达、从 b[i-1] 不可达的全部提交（包括合并进来的分支），
+    各范围互不重叠，合起来正好是 rev 的全部历史。边界从最早的提交开始按固定间隔选取，
+    新增提交只会改变最后一个范围，之前的分片结果可以直接复用。
+
+    :param repo_dir: 本地仓库路径
+    :param rev: 要分析的分支
+    :param shard_size: 每个分片包含的第一父提交数
+    :return: [(起点, 终点)]，起点为 None 表示从根提交开始
+    """
+    chain = subprocess.run(["git", "-C", repo_dir, "rev-list", "--first-parent", "--reverse", rev],
+                           capture_output=True, text=True, check=True).stdout.split()
+    if not chain:
+        return []
+    ends = chain[shard_size - 1::shard_size]
+    if ends[-1:] != chain[-1:]:
+        ends.append(chain[-1])
+    return list(zip([None] + ends[:-1], ends))
+
+
+def shard_range(start, end):
+    return f"{start}..{end}" if start else end
+
+
+def shard_cache_path(cache_dir, start, end, depth):
+    # 提交对象不可变，同一对端点的结果永远不变
+    return os.path.join(cache_dir, f"{(start or 'root')[:16]}_{end[:16]}_d{depth}.json")
+
+
+def rename_target(path):
+    """
+    把 numstat 中的重命名写法还原为新路径，如 "src/{a => b}/c.cs" -> "src/b/c.cs"、"a.cs => b.cs" -> "b.cs"。
+    """
+    if " => " not in path:
+        return path
+    brace = path.find("{")
+    if brace >= 0 and path.find("}", brace) > 0:
+        close = path.find("}", brace)
+        new = path[brace + 1:close].split(" => ", 1)[1]
+        return (path[:brace] + new + path[close + 1:]).replace("//", "/")
+    return path.split(" => ", 1)[1]
+
+
+def directory_of(path, depth):
+    """
+    :return: 文件所在目录的前 depth 级，根目录下的文件为 "."
+    """
+    parts = path.split("/")[:-1]
+    return "/".join(parts[:depth]) or "."
+
+
+def analyze_shard(repo_dir, start, end, depth=2):
+    """
+    用一次流式的 git log --numstat 统计一个修订范围内各提交的改动行数。
+
+    合并提交不计入（其改动已体现在被合并的提交中）；二进制文件只计入修改次数，不计行数。
+
+    :param repo_dir: 本地仓库路径
+    :param start: 范围起点（不含），None 表示从根提交开始
+    :param end: 范围终点
+    :param depth: 目录统计使用的目录层级
+    :return: 分片统计结果字典：commits、authors、directories、files、months
+    """
+    authors = defaultdict(lambda: [0, 0, 0, 0])  # 作者 -> [提交数, 新增行, 删除行, 修改文件次数]
+    directories = defaultdict(lambda: [0, 0, 0])  # 目录 -> [提交数, 新增行, 删除行]
+    files = defaultdict(lambda: [0, 0, 0])  # 文件 -> [提交数, 新增行, 删除行]
+    months = defaultdict(Counter)  # YYYY-MM -> {文件: 改动行数}
+    commits = 0
+
+    process = subprocess.Popen(
+        ["git", "-C", repo_dir, "-c", "core.quotepath=off", "log", "--numstat", "--no-merges",
+         f"--format={GIT_LOG_FORMAT}", shard_range(start, end)],
+        stdout=subprocess.PIPE, encoding="utf-8", errors="replace",
+    )
+    author = month = None
+    touched_dirs = set()
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        if line.startswith("\x1e"):
+            _, author, timestamp = line[1:].split("\x1f")
+            month = datetime.fromtimestamp(int(timestamp)).strftime("%Y-%m")
+            commits += 1
+            authors[author][0] += 1
+            touched_dirs.clear()
+            continue
+        if not line:
+            continue
+        added, deleted, path = line.split("\t", 2)
+        path = rename_target(path)
+        added = int(added) if added != "-" else 0
+        deleted = int(deleted) if deleted != "-" else 0
+
+        author_row = authors[author]
+        author_row[1] += added
+        author_row[2] += deleted
+        author_row[3] += 1
+        file_row = files[path]
+        file_row[0] += 1
+        file_row[1] += added
+        file_row[2] += deleted
+        directory = directory_of(path, depth)
+        directory_row = directories[directory]
+        if directory not in touched_dirs:
+            touched_dirs.add(directory)
+            directory_row[0] += 1
+        directory_row[1] += added
+        directory_row[2] += deleted
+        months[month][path] += added + deleted
+    process.stdout.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+    return {
+        "version": CACHE_VERSION,
+        "range": shard_range(start, end),
+        "commits": commits,
+        "authors": dict(authors),
+        "directories": dict(directories),
+        "files": dict(files),
+        "months": {month: dict(counts) for month, counts in months.items()},
+    }
+
+
+def load_shard(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            shard = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return shard if shard.get("version") == CACHE_VERSION else None
+
+
+def save_shard(shard, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(shard, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def prune_shard_cache(cache_dir, live_paths):
+    """
+    删除不属于当前分片集合的缓存文件（历史被改写或分片大小变化后，旧分片不会再被读取）。
+
+    :param cache_dir: 分片结果缓存目录
+    :param live_paths: 当前分片对应的缓存文件路径
+    :return: 删除的文件数
+    """
+    live = {os.path.basename(path) for path in live_paths}
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith((".json", ".json.tmp")) and name not in live:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+# 在子进程中统计一个分片，并把耗时一起带回父进程
+def traced_analyze_shard(repo_dir, start, end, depth=2):
+    return tracing.traced_call("shard", shard_range(start, end), analyze_shard, repo_dir, start, end, depth)
+
+
+def collect_shards(repo_dir, rev="develop", shard_size=500, depth=2, jobs=1, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    划分分片，未缓存的分片分发到进程池统计，已缓存的分片直接读取。
+
+    :param repo_dir: 本地仓库路径
+    :param rev: 要分析的分支
+    :param shard_size: 每个分片包含的第一父提交数
+    :param depth: 目录统计使用的目录层级
+    :param jobs: 并行统计的进程数
+    :param cache_dir: 分片结果缓存目录，为 None 时不缓存
+    :return: 分片统计结果列表（按历史从旧到新）
+    """
+    with tracing.span("shard boundaries", rev=rev) as span_args:
+        boundaries = shard_boundaries(repo_dir, rev, shard_size)
+        span_args["shards"] = len(boundaries)
+
+    shards = [None] * len(boundaries)
+    pending = []
+    for index, (start, end) in enumerate(boundaries):
+        if cache_dir is not None:
+            shards[index] = load_shard(shard_cache_path(cache_dir, start, end, depth))
+        if shards[index] is None:
+            pending.append(index)
+    print(f"{len(boundaries)} shards, {len(boundaries) - len(pending)} cached, {len(pending)} to analyze")
+
+    traced = tracing.enabled()
+    function = traced_analyze_shard if traced else analyze_shard
+    starts = [boundaries[index][0] for index in pending]
+    ends = [boundaries[index][1] for index in pending]
+    with tracing.span("analyze shards", shards=len(pending), jobs=jobs):
+        if jobs > 1 and len(pending) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(pending)))
+            results = executor.map(functools.partial(function, repo_dir, depth=depth), starts, ends)
+        else:
+            executor = None
+            results = (function(repo_dir, start, end, depth) for start, end in zip(starts, ends))
+        try:
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+            for index, shard in zip(pending, results):
+                if traced:
+                    shard, event = shard
+                    tracing.add_event(event)
+                shards[index] = shard
+                if cache_dir is not None:
+                    save_shard(shard, shard_cache_path(cache_dir, *boundaries[index], depth))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        removed = prune_shard_cache(cache_dir, (shard_cache_path(cache_dir, start, end, depth)
+                                                for start, end in boundaries))
+        if removed:
+            print(f"Pruned {removed} stale shard cache files")
+    return shards
+
+
+def merge_shards(shards, period="month"):
+    """
+    合并各分片的统计结果。
+
+    :param shards: collect_shards 的结果
+    :param period: 热点文件排名的时间粒度：month、quarter 或 year
+    :return: (提交数, 作者表, 目录表, 文件表, {时间段: Counter(文件: 改动行数)})
+    """
+    period_key = PERIOD_KEYS[period]
+    commits = 0
+    tables = [defaultdict(lambda: [0, 0, 0, 0]), defaultdict(lambda: [0, 0, 0]), defaultdict(lambda: [0, 0, 0])]
+    periods = defaultdict(Counter)
+    for shard in shards:
+        commits += shard["commits"]
+        for table, rows in zip(tables, (shard["authors"], shard["directories"], shard["files"])):
+            for key, values in rows.items():
+                row = table[key]
+                for i, value in enumerate(values):
+                    row[i] += value
+        for month, counts in shard["months"].items():
+            periods[period_key(month)].update(counts)
+    return (commits, *tables, periods)
+
+
+def sorted_by_churn(table):
+    # 按改动行数（新增 + 删除）降序
+    return sorted(table.items(), key=lambda item: (-(item[1][1] + item[1][2]), item[0]))
+
+
+def write_churn_tables(output_dir, authors, directories, files, periods, top=20):
+    """
+    把作者、目录、文件的改动统计和各时间段的热点文件排名写出为 CSV。
+
+    :param output_dir: 输出目录
+    :param top: 每个时间段保留的热点文件数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tables = [
+        ("churn_authors.csv", ["author", "commits", "added", "deleted", "churn", "files_touched"], authors),
+        ("churn_directories.csv", ["directory", "commits", "added", "deleted", "churn"], directories),
+        ("churn_files.csv", ["file", "commits", "added", "deleted", "churn"], files),
+    ]
+    for name, header, table in tables:
+        path = os.path.join(output_dir, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for key, row in sorted_by_churn(table):
+                writer.writerow([key, row[0], row[1], row[2], row[1] + row[2], *row[3:]])
+        tracing.count_bytes("written", os.path.getsize(path))
+
+    path = os.path.join(output_dir, "churn_hot_files.csv")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["period", "rank", "file", "churn"])
+        for period in sorted(periods):
+            ranking = sorted(periods[period].items(), key=lambda item: (-item[1], item[0]))[:top]
+            for rank, (file, churn) in enumerate(ranking, 1):
+                writer.writerow([period, rank, file, churn])
+    tracing.count_bytes("written", os.path.getsize(path))
+
+
+def analyze_churn(repo_dir, rev="develop", shard_size=500, depth=2, jobs=1, period="month",
+                  cache_dir=DEFAULT_CACHE_DIR, output_dir=DEFAULT_OUTPUT_DIR, top=20):
+    """
+    统计 rev 历史中各作者、目录、文件的改动行数，以及各时间段改动最多的文件。
+
+    :param repo_dir: 本地仓库路径
+    :param rev: 要分析的分支
+    :param shard_size: 每个分片包含的第一父提交数
+    :param depth: 目录统计使用的目录层级
+    :param jobs: 并行统计的进程数
+    :param period: 热点文件排名的时间粒度
+    :param cache_dir: 分片结果缓存目录
+    :param output_dir: CSV 输出目录
+    :param top: 输出的热点文件数
+    """
+    shards = collect_shards(repo_dir, rev, shard_size, depth, jobs, cache_dir)
+    with tracing.span("merge shards", shards=len(shards)):
+        commits, authors, directories, files, periods = merge_shards(shards, period)
+    with tracing.span("write tables"):
+        write_churn_tables(output_dir, authors, directories, files, periods, top)
+
+    print(f"共 {commits} 个提交（不含合并提交），{len(authors)} 位作者，{len(files)} 个文件")
+    for title, table in (("作者", authors), ("目录", directories), ("文件", files)):
+        print(f"\n改动行数最多的{title}:")
+        for key, row in sorted_by_churn(table)[:top]:
+            print(f"{key}: +{row[1]} -{row[2]}（{row[0]} 个提交）")
+    print(f"\n结果已保存到 {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按修订范围分片并行统计提交的改动行数（作者、目录、文件和热点文件）")
+    parser.add_argument("repo", nargs="?", default="SteamTools", help="本地仓库路径")
+    parser.add_argument("--rev", default="develop", help="要分析的分支（默认 develop）")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="并行统计的进程数，0 表示使用全部 CPU 核心")
+    parser.add_argument("--shard-size", type=int, default=500,
+                        help="每个分片包含的第一父提交数（默认 500；修改后之前的分片缓存不再命中）")
+    parser.add_argument("--depth", type=int, default=2, help="目录统计使用的目录层级（默认 2）")
+    parser.add_argument("--period", choices=list(PERIOD_KEYS), default="month", help="热点文件排名的时间粒度")
+    parser.add_argument("--top", type=int, default=20, help="输出和每个时间段保留的热点文件数")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="分片结果缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入分片缓存")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_DIR, help="CSV 输出目录")
+    parser.add_argument("--trace", help="记录各阶段和各分片的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    analyze_churn(args.repo, args.rev, args.shard_size, args.depth, jobs, args.period,
+                  None if args.no_cache else args.cache_dir, args.output, args.top)
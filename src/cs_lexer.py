@@ -0,0 +1,235 @@
+import re
+
+# 代码中可能开始一个字符串、字符、注释或预处理指令的字符；其余字符一律视为普通代码，整段跳过
+_SPECIAL = re.compile(r"[\"'/@$#]")
+
+# 以下表达式按“普通字符*(转义 普通字符*)*”展开循环，各部分匹配的字符互不重叠，结尾的引号可选，
+# 因此不会回溯，匹配时间与字面量长度成正比
+_REGULAR_STRING = re.compile(r'"([^"\\\n]*(?:\\.[^"\\\n]*)*)"?')
+_VERBATIM_STRING = re.compile(r'@"([^"]*(?:""[^"]*)*)"?')
+_CHAR = re.compile(r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'?")
+_QUOTES = re.compile(r'"+')
+_ESCAPE = re.compile(r"\\([\\\"'])")
+
+# 插值字符串中下一个需要处理的字符
+_INTERPOLATED_SPECIAL = re.compile(r'["\\{}\n]')
+_INTERPOLATED_VERBATIM_SPECIAL = re.compile(r'["{}]')
+# 插值表达式中下一个需要处理的字符
+_HOLE_SPECIAL = re.compile(r"[{}\"'@$]")
+
+# 插值表达式在字符串值中的占位符
+HOLE = "{}"
+
+
+class LexedSource:
+    """
+    C# 源文件按上下文分类后的内容。
+
+    code 为去掉字符串、字符、注释和预处理指令后的代码；strings 为各字符串字面量的值
+    （普通字符串的 \\\\、\\" 已还原，逐字字符串的 "" 已还原，插值表达式替换为 {}）；
+    comments 为注释原文；directives 为预处理指令行。
+    """
+
+    __slots__ = ("code", "strings", "comments", "directives")
+
+    def __init__(self):
+        self.code = []
+        self.strings = []
+        self.comments = []
+        self.directives = []
+
+    def segments(self, context):
+        """
+        :param context: "code"、"string"、"comment" 或 "directive"
+        :return: 该上下文中的文本列表
+        """
+        if context == "code":
+            return self.code
+        if context == "string":
+            return self.strings
+        if context == "comment":
+            return self.comments
+        if context == "directive":
+            return self.directives
+        raise ValueError(f"Unknown context: {context}")
+
+
+def _scan_raw_string(code, pos):
+    """
+    原始字符串（C# 11，三个及以上的双引号）。
+
+    :param pos: 开头引号的位置
+    :return: (结束位置, 字符串值)
+    """
+    quotes = _QUOTES.match(code, pos).end() - pos
+    end = code.find('"' * quotes, pos + quotes)
+    if end < 0:
+        return len(code), code[pos + quotes:]
+    return end + quotes, code[pos + quotes:end]
+
+
+def _skip_hole(code, pos):
+    """
+    跳过插值表达式（可以包含嵌套的字符串和插值字符串）。
+
+    :param pos: 左花括号之后的位置
+    :return: 对应右花括号之后的位置
+    """
+    depth = 0
+    while True:
+        match = _HOLE_SPECIAL.search(code, pos)
+        if match is None:
+            return len(code)
+        pos = match.start()
+        char = code[pos]
+        if char == "{":
+            depth += 1
+            pos += 1
+        elif char == "}":
+            if depth == 0:
+                return pos + 1
+            depth -= 1
+            pos += 1
+        elif char == "'":
+            pos = _CHAR.match(code, pos).end()
+        else:
+            end, _ = _scan_string(code, pos)
+            pos = end if end is not None else pos + 1
+
+
+def _scan_interpolated(code, pos, verbatim):
+    """
+    插值字符串，花括号中的表达式替换为占位符。
+
+    :param pos: 开头引号的位置
+    :param verbatim: 是否为逐字插值字符串（$@"..."）
+    :return: (结束位置, 字符串值)
+    """
+    special = _INTERPOLATED_VERBATIM_SPECIAL if verbatim else _INTERPOLATED_SPECIAL
+    parts = []
+    start = pos = pos + 1
+    while True:
+        match = special.search(code, pos)
+        if match is None:
+            parts.append(code[start:])
+            return len(code), "".join(parts)
+        pos = match.start()
+        char = code[pos]
+        if char == '"':
+            if verbatim and code.startswith('""', pos):
+                parts.append(code[start:pos + 1])
+                start = pos = pos + 2
+                continue
+            parts.append(code[start:pos])
+            return pos + 1, "".join(parts)
+        if char == "\\":
+            pos += 2
+        elif char == "\n":
+            # 未闭合的普通插值字符串在行尾结束
+            parts.append(code[start:pos])
+            return pos, "".join(parts)
+        elif code.startswith("{{", pos) or code.startswith("}}", pos):
+            parts.append(code[start:pos + 1])
+            start = pos = pos + 2
+        elif char == "}":
+            pos += 1
+        else:
+            parts.append(code[start:pos])
+            parts.append(HOLE)
+            start = pos = _skip_hole(code, pos + 1)
+
+
+def _scan_string(code, pos):
+    """
+    从 pos 开始识别一个字符串字面量（普通、逐字、插值、原始字符串及其组合）。
+
+    :return: (结束位置, 字符串值)；pos 处不是字符串时返回 (None, None)
+    """
+    prefix_end = pos
+    dollars = 0
+    verbatim = False
+    while prefix_end < len(code) and code[prefix_end] in "$@":
+        if code[prefix_end] == "$":
+            dollars += 1
+        else:
+            verbatim = True
+        prefix_end += 1
+    if not code.startswith('"', prefix_end) or prefix_end - pos > dollars + 1:
+        return None, None
+
+    if code.startswith('"""', prefix_end):
+        return _scan_raw_string(code, prefix_end)
+    if dollars:
+        end, value = _scan_interpolated(code, prefix_end, verbatim)
+        return end, _ESCAPE.sub(r"\1", value) if not verbatim else value
+    if verbatim:
+        match = _VERBATIM_STRING.match(code, pos)
+        return match.end(), match.group(1).replace('""', '"')
+    match = _REGULAR_STRING.match(code, pos)
+    return match.end(), _ESCAPE.sub(r"\1", match.group(1))
+
+
+def lex(code):
+    """
+    单遍扫描 C# 源代码，把字符串字面量、注释和预处理指令与普通代码分开。
+
+    扫描只在可能开始这些结构的字符处停下，字面量和注释的结束位置用 find 或不回溯的正则表达式查找，
+    总耗时与文件长度成正比。
+
+    :param code: 源代码
+    :return: LexedSource
+    """
+    source = LexedSource()
+    code_parts = []
+    last = pos = 0
+    length = len(code)
+    # blank_checked 之前的本行内容是否都是空白；每段文本只检查一次，长行上的大量 # 不会被重复扫描
+    line_blank = True
+    blank_checked = 0
+    while True:
+        match = _SPECIAL.search(code, pos)
+        if match is None:
+            break
+        pos = match.start()
+        char = code[pos]
+        end = None
+
+        if char == "/":
+            if code.startswith("//", pos):
+                end = code.find("\n", pos)
+                end = length if end < 0 else end
+                source.comments.append(code[pos:end].rstrip("\r"))
+            elif code.startswith("/*", pos):
+                end = code.find("*/", pos + 2)
+                end = length if end < 0 else end + 2
+                source.comments.append(code[pos:end])
+        elif char == "'":
+            end = _CHAR.match(code, pos).end()
+        elif char == "#":
+            # 只有行首（前面只有空白）的 # 才是预处理指令
+            newline = code.rfind("\n", blank_checked, pos)
+            if newline >= 0:
+                line_blank = not code[newline + 1:pos].strip()
+            else:
+                line_blank = line_blank and not code[blank_checked:pos].strip()
+            blank_checked = pos
+            if line_blank:
+                end = code.find("\n", pos)
+                end = length if end < 0 else end
+                source.directives.append(code[pos:end].rstrip("\r"))
+        else:
+            end, value = _scan_string(code, pos)
+            if end is not None:
+                source.strings.append(value)
+
+        if end is None:
+            # 除号、标识符前缀 @ 等普通代码
+            pos += 1
+            continue
+        code_parts.append(code[last:pos])
+        last = pos = end
+
+    code_parts.append(code[last:])
+    # 字面量和注释的位置用空格隔开，规则不会跨越它们匹配
+    source.code.append(" ".join(code_parts))
+    return source
@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import sqlite3
+
+DEFAULT_STORE_PATH = "./data/analysis.db"
+# 等待其他进程释放写锁的最长时间（秒）
+BUSY_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    hash TEXT PRIMARY KEY,
+    author TEXT NOT NULL,
+    email TEXT,
+    date TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_commits_author ON commits (author);
+CREATE INDEX IF NOT EXISTS idx_commits_date ON commits (date);
+
+CREATE TABLE IF NOT EXISTS issues (
+    number INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    author TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    closed_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_issues_author ON issues (author);
+CREATE INDEX IF NOT EXISTS idx_issues_state ON issues (state);
+CREATE INDEX IF NOT EXISTS idx_issues_created_at ON issues (created_at);
+
+CREATE TABLE IF NOT EXISTS pulls (
+    number INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    author TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    closed_at TEXT,
+    merged_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pulls_author ON pulls (author);
+CREATE INDEX IF NOT EXISTS idx_pulls_state ON pulls (state);
+CREATE INDEX IF NOT EXISTS idx_pulls_created_at ON pulls (created_at);
+"""
+
+
+def open_store(path=DEFAULT_STORE_PATH):
+    """
+    打开（必要时创建）本地数据库。
+
+    :param path: SQLite 数据库文件路径
+    :return: sqlite3.Connection
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # 流水线中拉取提交和获取 Issue 的阶段会同时写入同一个库：写锁被占用时等待而不是立即报错
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def upsert_commits(conn, commits):
+    """
+    写入提交记录（与 commit_info.json 中的结构相同），已存在的提交会被覆盖。
+
+    :param conn: 数据库连接
+    :param commits: 提交记录的可迭代对象
+    """
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO commits (hash, author, email, date, message) VALUES (?, ?, ?, ?, ?)",
+            ((c["hash"], c["author"], c["email"], c["date"], c["message"]) for c in commits),
+        )
+
+
+def clear_commits(conn):
+    """
+    清空提交记录（历史被改写、需要完整重建时使用）。
+    """
+    with conn:
+        conn.execute("DELETE FROM commits")
+
+
+def tee_into(conn, records, upsert, batch_size=1000):
+    """
+    在遍历记录的同时分批写入数据库，调用方照常逐条处理记录。
+
+    :param conn: 数据库连接
+    :param records: 记录的可迭代对象
+    :param upsert: 写入函数，如 upsert_commits
+    :param batch_size: 每批写入的记录数
+    :return: 生成器，原样产出 records 中的记录
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        yield record
+        if len(batch) >= batch_size:
+            upsert(conn, batch)
+            batch = []
+    if batch:
+        upsert(conn, batch)
+
+
+def upsert_issues(conn, issues):
+    """
+    写入 GitHub API 返回的 issue 记录，按编号覆盖已有记录。
+
+    :param conn: 数据库连接
+    :param issues: issue 记录的可迭代对象
+    """
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO issues (number, state, author, created_at, updated_at, closed_at, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((i["number"], i["state"], (i.get("user") or {}).get("login"), i.get("created_at"),
+              i.get("updated_at"), i.get("closed_at"), json.dumps(i, ensure_ascii=False)) for i in issues),
+        )
+
+
+def upsert_pulls(conn, pulls):
+    """
+    写入 GitHub API 返回的 pull request 记录，按编号覆盖已有记录。
+
+    :param conn: 数据库连接
+    :param pulls: pull request 记录的可迭代对象
+    """
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO pulls (number, state, author, created_at, updated_at, closed_at, merged_at, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((p["number"], p["state"], (p.get("user") or {}).get("login"), p.get("created_at"),
+              p.get("updated_at"), p.get("closed_at"), p.get("merged_at"), json.dumps(p, ensure_ascii=False))
+             for p in pulls),
+        )
+
+
+def _where(filters):
+    clauses = [clause for clause, value in filters if value is not None]
+    params = [value for _, value in filters if value is not None]
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def query_commits(conn, author=None, since=None, until=None):
+    """
+    按作者和日期范围查询提交，逐条产出，不一次性加载全部数据。
+
+    :param conn: 数据库连接
+    :param author: 作者名
+    :param since: 起始日期（含），ISO 格式字符串，如 "2021-07-01"
+    :param until: 结束日期（不含），ISO 格式字符串
+    :return: 生成器，产出提交记录字典
+    """
+    where, params = _where([("author = ?", author), ("date >= ?", since), ("date < ?", until)])
+    for row in conn.execute(f"SELECT hash, author, email, date, message FROM commits{where} ORDER BY date DESC",
+                            params):
+        yield dict(row)
+
+
+def count_commits_by_author(conn, since=None, until=None):
+    """
+    统计日期范围内每个作者的提交次数。
+
+    :return: [(作者, 提交次数)]，按提交次数降序
+    """
+    where, params = _where([("date >= ?", since), ("date < ?", until)])
+    return [tuple(row) for row in conn.execute(
+        f"SELECT author, COUNT(*) AS n FROM commits{where} GROUP BY author ORDER BY n DESC", params)]
+
+
+def _query_items(conn, table, state, author, since, until):
+    where, params = _where([("state = ?", state), ("author = ?", author),
+                            ("created_at >= ?", since), ("created_at < ?", until)])
+    for row in conn.execute(f"SELECT data FROM {table}{where} ORDER BY number DESC", params):
+        yield json.loads(row["data"])
+
+
+def query_issues(conn, state=None, author=None, since=None, until=None):
+    """
+    按状态、作者和创建时间范围查询 issue，逐条产出完整的 API 记录。
+
+    :param conn: 数据库连接
+    :param state: "open" 或 "closed"
+    :param author: 提出者的 GitHub 用户名
+    :param since: 创建时间下限（含），ISO 格式字符串
+    :param until: 创建时间上限（不含），ISO 格式字符串
+    :return: 生成器，产出 issue 记录字典
+    """
+    return _query_items(conn, "issues", state, author, since, until)
+
+
+def query_pulls(conn, state=None, author=None, since=None, until=None):
+    """
+    按状态、作者和创建时间范围查询 pull request，参数同 query_issues。
+    """
+    return _query_items(conn, "pulls", state, author, since, until)
+
+
+def get_issue(conn, number):
+    row = conn.execute("SELECT data FROM issues WHERE number = ?", (number,)).fetchone()
+    return json.loads(row["data"]) if row else None
+
+
+def get_pull(conn, number):
+    row = conn.execute("SELECT data FROM pulls WHERE number = ?", (number,)).fetchone()
+    return json.loads(row["data"]) if row else None
+
+
+def iter_json_array(f, chunk_size=1 << 20):
+    """
+    增量解析 JSON 数组，逐个产出数组元素，内存占用只与单个元素的大小有关。
+
+    :param f: 以文本模式打开的文件
+    :param chunk_size: 每次读取的字符数
+    :return: 生成器，产出数组元素
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def skip(chars):
+        nonlocal pos
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in chars):
+            pos += 1
+
+    while True:
+        skip(",]" if started else "")
+        if pos >= len(buffer):
+            if eof:
+                break
+            buffer = f.read(chunk_size)
+            pos = 0
+            eof = not buffer
+            continue
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("JSON 文件的顶层不是数组")
+            pos += 1
+            started = True
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # 元素后面必须紧跟分隔符，否则可能是被截断的元素（例如只读到 "1." 或 "2e" 时会先解析出 1、2），继续读取
+        complete = end is not None and end < len(buffer) and (buffer[end] in ",]" or buffer[end].isspace())
+        if not complete and not eof:
+            chunk = f.read(max(chunk_size, len(buffer) - pos))
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+        if end is None:
+            raise ValueError(f"JSON 数组不完整：{buffer[pos:pos + 80]!r}")
+        yield item
+        pos = end
+
+
+def iter_json_records(path):
+    """
+    读取 JSON 数组文件或 JSON Lines 文件（.jsonl）中的记录，两种格式都逐条解析，不一次性载入整个文件。
+
+    :param path: 文件路径
+    :return: 生成器，产出记录
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+# 根据文件名判断导入的数据类型
+IMPORTERS = {
+    "commit": upsert_commits,
+    "issue": upsert_issues,
+    "pr": upsert_pulls,
+}
+
+
+def import_json(conn, path, kind=None):
+    """
+    导入已有的 JSON 数据文件。
+
+    :param conn: 数据库连接
+    :param path: commit_info.json / commit_info.jsonl / issue_info.json / pr_info.json 等文件路径
+    :param kind: "commit"、"issue" 或 "pr"，为 None 时根据文件名判断
+    """
+    if kind is None:
+        name = os.path.basename(path)
+        kind = next((k for k in IMPORTERS if name.startswith(k)), None)
+        if kind is None:
+            raise ValueError(f"无法根据文件名判断数据类型：{path}")
+    IMPORTERS[kind](conn, iter_json_records(path))
+    print(f"Imported {path} as {kind}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将已有的 JSON 数据导入本地 SQLite 数据库")
+    parser.add_argument("files", nargs="+", help="要导入的 JSON 文件")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="数据库文件路径")
+    parser.add_argument("--kind", choices=sorted(IMPORTERS), help="数据类型，默认根据文件名判断")
+    args = parser.parse_args()
+
+    store = open_store(args.db)
+    for file in args.files:
+        import_json(store, file, args.kind)
+    store.close()
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "static_analysis.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    module TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_module ON files (module);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    template TEXT NOT NULL,
+    UNIQUE (code, template)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_code ON messages (code);
+
+CREATE TABLE IF NOT EXISTS diagnostics (
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    line INTEGER,
+    "column" INTEGER,
+    severity TEXT NOT NULL,
+    message_id INTEGER NOT NULL REFERENCES messages (id),
+    arguments TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_diagnostics_file ON diagnostics (file_id);
+CREATE INDEX IF NOT EXISTS idx_diagnostics_message ON diagnostics (message_id, severity);
+CREATE INDEX IF NOT EXISTS idx_diagnostics_severity ON diagnostics (severity);
+"""
+
+# 分析器输出的诊断行，例如 "(8,12): error CS0246: ..." 或 "error CS5001: ..."
+DIAGNOSTIC_PATTERN = re.compile(r"^(?:\((\d+),(\d+)\): )?(error|warning|info|hidden) (\w+): (.*)$")
+# 无法识别为诊断的输出行使用的严重级别：原样保存以便重新生成报告，但不计入任何汇总
+UNPARSED = "unparsed"
+
+# 消息中用单引号括起的部分（类型名、成员名等）视为参数
+ARGUMENT_PATTERN = re.compile(r"'([^']*)'")
+PLACEHOLDER_PATTERN = re.compile(r"\{(\d+)\}")
+
+# 汇总查询可以使用的分组字段
+GROUP_COLUMNS = {
+    "code": "m.code",
+    "severity": "d.severity",
+    "module": "f.module",
+    "file": "f.path",
+    "template": "m.template",
+}
+
+
+def split_message(message):
+    """
+    把诊断消息拆分为模板和参数，相同模板的消息在库中只保存一次。
+
+    例如 "The type or namespace name 'Mono' could not be found" 拆分为
+    ("The type or namespace name '{0}' could not be found", ["Mono"])。
+
+    :param message: 诊断消息
+    :return: (消息模板, 参数列表)
+    """
+    arguments = []
+
+    def placeholder(match):
+        arguments.append(match.group(1))
+        return f"'{{{len(arguments) - 1}}}'"
+
+    template = ARGUMENT_PATTERN.sub(placeholder, message)
+    # 消息本身含有 {数字} 等无法还原的内容时，整条消息作为模板
+    if format_message(template, arguments) != message:
+        return message, []
+    return template, arguments
+
+
+def format_message(template, arguments):
+    """
+    :return: 用参数填充模板得到的消息
+    """
+    if not arguments:
+        return template
+    try:
+        return PLACEHOLDER_PATTERN.sub(lambda match: arguments[int(match.group(1))], template)
+    except IndexError:
+        return None
+
+
+def parse_output(output):
+    """
+    解析分析器的文本输出。
+
+    :param output: 分析输出，每行一条诊断
+    :return: 诊断列表 [{"line", "column", "severity", "id", "message"}]；无法识别的行严重级别为 UNPARSED、id 为空、原样保存在 message 中
+    """
+    diagnostics = []
+    for line in (output or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = DIAGNOSTIC_PATTERN.match(line)
+        if match:
+            row, column, severity, code, message = match.groups()
+            diagnostics.append({"line": int(row) if row else None, "column": int(column) if column else None,
+                                "severity": severity, "id": code, "message": message})
+        else:
+            diagnostics.append({"line": None, "column": None, "severity": UNPARSED, "id": "", "message": line})
+    return diagnostics
+
+
+def format_diagnostic(line, column, severity, code, message):
+    """
+    :return: 与分析器文本输出格式相同的诊断行
+    """
+    if not code:
+        return message
+    location = f"({line},{column}): " if line is not None else ""
+    return f"{location}{severity} {code}: {message}"
+
+
+class DiagnosticsStore:
+    """
+    静态分析诊断的本地 SQLite 库。
+
+    每条诊断按文件、行列、严重级别、诊断代码、消息模板和参数保存，重复的消息模板只保存一次；
+    报告和按代码 / 模块 / 严重级别的汇总都直接查询此库，无需重新读取 .result 文件。
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        """
+        :param path: 数据库文件路径，":memory:" 表示只在内存中保存
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.message_ids = {}  # (代码, 模板) -> 消息编号，避免重复查询
+
+    def clear(self):
+        """
+        清空全部诊断（完整重新分析前调用）。
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM diagnostics")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM messages")
+        self.message_ids.clear()
+
+    def _message_id(self, code, template):
+        key = (code, template)
+        message_id = self.message_ids.get(key)
+        if message_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO messages (code, template) VALUES (?, ?)", key)
+            message_id = self.conn.execute("SELECT id FROM messages WHERE code = ? AND template = ?",
+                                           key).fetchone()[0]
+            self.message_ids[key] = message_id
+        return message_id
+
+    def add_file(self, module, path, output, error, diagnostics=None):
+        """
+        保存一个文件的分析结果，覆盖该文件已有的记录。
+
+        :param module: 模块名，直接存放在根路径下的文件为 ""
+        :param path: 文件路径
+        :param output: 分析器的文本输出
+        :param error: 错误信息，分析失败时非空
+        :param diagnostics: 结构化诊断（项目模式），为 None 时从 output 中解析
+        """
+        if not error and output is None:
+            error = "No output from C# analyzer."
+        old = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if old:
+            self.conn.execute("DELETE FROM diagnostics WHERE file_id = ?", old)
+            self.conn.execute("DELETE FROM files WHERE id = ?", old)
+        file_id = self.conn.execute("INSERT INTO files (module, path, error) VALUES (?, ?, ?)",
+                                    (module, path, error.strip() if error else None)).lastrowid
+        if error:
+            return
+
+        rows = []
+        for diagnostic in diagnostics if diagnostics is not None else parse_output(output):
+            template, arguments = split_message(diagnostic["message"])
+            rows.append((file_id, diagnostic["line"], diagnostic["column"], diagnostic["severity"],
+                         self._message_id(diagnostic["id"], template),
+                         json.dumps(arguments, ensure_ascii=False) if arguments else None))
+        self.conn.executemany(
+            'INSERT INTO diagnostics (file_id, line, "column", severity, message_id, arguments)'
+            " VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def commit(self):
+        self.conn.commit()
+
+    def modules(self):
+        """
+        :return: 模块名列表（按名称排序，不含根路径下的单独文件）
+        """
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT module FROM files WHERE module != '' ORDER BY module")]
+
+    def iter_results(self, module=None, path=None):
+        """
+        按模块、文件路径的顺序逐个还原文件的分析结果，根路径下的单独文件排在最后。
+
+        :param module: 只返回该模块的文件
+        :param path: 只返回该文件
+        :return: 生成器，产出 (文件路径, 分析输出, 错误信息)，输出格式与分析器的文本输出相同
+        """
+        clauses = [clause for clause, value in (("f.module = ?", module), ("f.path = ?", path)) if value is not None]
+        params = [value for value in (module, path) if value is not None]
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        rows = self.conn.execute(
+            'SELECT f.id, f.path, f.error, d.line, d."column", d.severity, m.code, m.template, d.arguments'
+            f" FROM files f LEFT JOIN diagnostics d ON d.file_id = f.id LEFT JOIN messages m ON m.id = d.message_id"
+            f"{where} ORDER BY f.module = '', f.module, f.path, d.rowid", params)
+
+        current = None
+        lines = []
+        for file_id, file_path, error, line, column, severity, code, template, arguments in rows:
+            if current is not None and file_id != current[0]:
+                yield current[1], "\n".join(lines), current[2] or ""
+                lines = []
+            current = (file_id, file_path, error)
+            if template is not None:
+                message = format_message(template, json.loads(arguments) if arguments else [])
+                lines.append(format_diagnostic(line, column, severity, code, message))
+        if current is not None:
+            yield current[1], "\n".join(lines), current[2] or ""
+
+    def counts(self, group_by=("code",), module=None, severity=None, code=None):
+        """
+        按代码、模块、严重级别等字段汇总诊断数量（不包含无法识别的输出行）。
+
+        :param group_by: 分组字段，取自 GROUP_COLUMNS
+        :param module: 只统计该模块
+        :param severity: 只统计该严重级别
+        :param code: 只统计该诊断代码
+        :return: [(分组字段值..., 数量)]，按数量降序
+        """
+        columns = [GROUP_COLUMNS[field] for field in group_by]
+        filters = [("d.severity != ?", UNPARSED), ("f.module = ?", module), ("d.severity = ?", severity),
+                   ("m.code = ?", code)]
+        clauses = [clause for clause, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+        where = " WHERE " + " AND ".join(clauses)
+        select = ", ".join(columns + ["COUNT(*) AS n"])
+        group = " GROUP BY " + ", ".join(columns) if columns else ""
+        return [tuple(row) for row in self.conn.execute(
+            f"SELECT {select} FROM diagnostics d JOIN messages m ON m.id = d.message_id"
+            f" JOIN files f ON f.id = d.file_id{where}{group} ORDER BY n DESC", params)]
+
+    def file_counts(self):
+        """
+        :return: (文件总数, 分析失败的文件数)
+        """
+        return self.conn.execute("SELECT COUNT(*), COUNT(error) FROM files").fetchone()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查询静态分析诊断库中的诊断数量")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="数据库文件路径")
+    parser.add_argument("--group-by", default="code",
+                        help=f"分组字段，逗号分隔，可选 {', '.join(GROUP_COLUMNS)}（默认 code）")
+    parser.add_argument("--module", help="只统计该模块")
+    parser.add_argument("--severity", choices=["error", "warning", "info", "hidden"], help="只统计该严重级别")
+    parser.add_argument("--code", help="只统计该诊断代码，如 CS0246")
+    parser.add_argument("--top", type=int, default=50, help="最多输出的行数")
+    args = parser.parse_args()
+
+    fields = [field.strip() for field in args.group_by.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in GROUP_COLUMNS]
+    if unknown:
+        parser.error(f"unknown --group-by field(s): {', '.join(unknown)} (choose from {', '.join(GROUP_COLUMNS)})")
+    with DiagnosticsStore(args.db) as store:
+        for row in store.counts(fields, args.module, args.severity, args.code)[:args.top]:
+            print("\t".join(str(value) for value in row))
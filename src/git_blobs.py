@@ -0,0 +1,115 @@
+import subprocess
+
+
+def git_output(repo_path, *args):
+    """
+    运行 git 命令并返回标准输出文本。
+
+    :param repo_path: git 仓库路径
+    :param args: git 子命令及参数
+    :return: 标准输出
+    """
+    result = subprocess.run(
+        ["git", "-C", repo_path, *args],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        check=True,
+    )
+    return result.stdout
+
+
+def resolve_revisions(repo_path, rev=None, rev_range=None):
+    """
+    把 --rev / --rev-range 参数展开为按时间从旧到新排列的提交列表。
+
+    :param repo_path: git 仓库路径
+    :param rev: 单个修订（分支、标签或提交）
+    :param rev_range: 修订范围，如 a..b
+    :return: [(提交哈希, 提交时间 ISO 字符串)]
+    """
+    if rev_range is not None:
+        output = git_output(repo_path, "log", "--reverse", "--format=%H %cI", rev_range)
+    else:
+        output = git_output(repo_path, "log", "-1", "--format=%H %cI", rev)
+    return [tuple(line.split(" ", 1)) for line in output.splitlines() if line]
+
+
+def list_blobs(repo_path, rev, subdir=None, suffix=".cs"):
+    """
+    列出某个修订中指定后缀的文件及其 blob OID，不需要检出工作区。
+
+    :param repo_path: git 仓库路径
+    :param rev: 修订
+    :param subdir: 只列出该子目录（相对仓库根目录）下的文件
+    :param suffix: 文件后缀
+    :return: [(仓库内路径, blob OID)]，按路径排序
+    """
+    args = ["ls-tree", "-r", "-z", rev]
+    if subdir:
+        args += ["--", subdir]
+    blobs = []
+    for entry in git_output(repo_path, *args).split("\0"):
+        if not entry:
+            continue
+        meta, path = entry.split("\t", 1)
+        _, object_type, oid = meta.split()
+        if object_type == "blob" and path.endswith(suffix):
+            blobs.append((path, oid))
+    return sorted(blobs)
+
+
+def repo_subdir(path):
+    """
+    定位 path 所在的 git 仓库。
+
+    :param path: 仓库内的目录
+    :return: (仓库根目录, path 相对根目录的路径；path 就是根目录时为 None)
+    """
+    top = git_output(path, "rev-parse", "--show-toplevel").strip()
+    subdir = git_output(path, "rev-parse", "--show-prefix").strip().rstrip("/")
+    return top, subdir or None
+
+
+class BlobReader:
+    """
+    通过常驻的 git cat-file --batch 进程直接从对象库读取 blob 内容。
+    """
+
+    def __init__(self, repo_path):
+        """
+        :param repo_path: git 仓库路径
+        """
+        self.process = subprocess.Popen(
+            ["git", "-C", repo_path, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, oid):
+        """
+        :param oid: blob OID
+        :return: blob 内容（bytes）
+        """
+        self.process.stdin.write(oid.encode() + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) < 3 or header[1] != b"blob":
+            raise KeyError(f"Blob not found: {oid}")
+        data = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)  # 内容后的换行符
+        return data
+
+    def read_text(self, oid):
+        return self.read(oid).decode("utf-8", errors="ignore")
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
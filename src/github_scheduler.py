@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import tracing
+
+# 需要重试的临时性错误
+RETRY_STATUS = {500, 502, 503, 504}
+
+
+class RequestScheduler:
+    """
+    GitHub API 请求调度器，包装 requests.Session，提供与 session.get 相同的接口。
+
+    - 根据 X-RateLimit-Remaining / X-RateLimit-Reset 控制请求节奏：额度充足时不等待，
+      剩余额度低于 reserve 时把剩余请求均匀分布到重置之前，额度耗尽时等待重置；
+    - 被限流的 403 / 429（带 Retry-After、额度耗尽或次级限流）时按 Retry-After（秒数或 HTTP 日期；
+      没有时按重置时间或退避时间）暂停所有线程后重试，其余 403 直接返回；
+    - 5xx 和连接错误使用带随机抖动的指数退避重试。
+
+    可以在多个线程中共享同一个调度器。
+    """
+
+    def __init__(self, session, max_retries=5, backoff_base=1.0, backoff_max=60.0, reserve=50):
+        """
+        :param session: requests.Session
+        :param max_retries: 单个请求的最大重试次数
+        :param backoff_base: 退避的基础秒数
+        :param backoff_max: 单次退避的最大秒数
+        :param reserve: 剩余额度低于该值时开始放慢请求
+        """
+        self.session = session
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.reserve = reserve
+        self.lock = threading.Lock()
+        self.next_request_at = 0.0  # 所有线程在此时间之前都不发送请求
+        self.remaining = None
+        self.reset_at = None
+
+        # 统计
+        self.requests = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    def _reserve_slot(self):
+        """
+        计算本次请求需要等待的时间，并为下一个请求预留间隔。
+        """
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_request_at)
+            interval = 0.0
+            if self.remaining is not None and self.reset_at is not None and self.reset_at > start:
+                if self.remaining <= 0:
+                    start = self.reset_at
+                    self.remaining = None  # 重置后的额度由下一个响应更新
+                else:
+                    if self.remaining < self.reserve:
+                        interval = (self.reset_at - start) / self.remaining
+                    self.remaining -= 1
+            self.next_request_at = start + interval
+            return start - now
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            with self.lock:
+                self.wait_seconds += seconds
+            time.sleep(seconds)
+
+    def _pause_all(self, seconds):
+        with self.lock:
+            self.next_request_at = max(self.next_request_at, time.time() + seconds)
+
+    def _update_budget(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.remaining = int(remaining)
+            self.reset_at = float(reset)
+
+    def _backoff(self, attempt):
+        # 完全抖动：在 [0, min(上限, 基数 * 2^attempt)] 内随机
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """
+        :param value: Retry-After 头，可以是秒数或 HTTP 日期（RFC 9110）
+        :return: 需要等待的秒数；无法解析时返回 None
+        """
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_secondary_rate_limit(response):
+        # 次级限流的 403 没有限流头，只在错误信息中说明
+        try:
+            message = response.json().get("message", "")
+        except (ValueError, AttributeError):
+            message = response.text
+        return "secondary rate limit" in message.lower()
+
+    def _rate_limit_wait(self, response, attempt):
+        """
+        :return: 被限流时需要暂停的秒数；不是限流响应时返回 None
+        """
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = self._parse_retry_after(response.headers.get("Retry-After", ""))
+        if retry_after is not None:
+            return retry_after
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            if "X-RateLimit-Reset" in response.headers:
+                return max(0.0, float(response.headers["X-RateLimit-Reset"]) - time.time()) + 1
+            return self._backoff(attempt)
+        # 429 和次级限流的 403 没有等待时间：指数退避，重试次数用尽后返回最后的响应
+        if response.status_code == 429 or self._is_secondary_rate_limit(response):
+            return self._backoff(attempt)
+        # 其余 403（权限不足、令牌无效等）不是限流，直接返回
+        return None
+
+    def get(self, url, **kwargs):
+        """
+        发送 GET 请求，必要时等待和重试。
+
+        :return: 最后一次的响应；重试次数用尽时可能仍是错误响应
+        """
+        attempt = 0
+        while True:
+            self._sleep(self._reserve_slot())
+            with self.lock:
+                self.requests += 1
+            start = time.perf_counter_ns()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                tracing.complete(f"GET {url}", "http", start, error=type(e).__name__, attempt=attempt)
+                if attempt >= self.max_retries:
+                    raise
+                wait = self._backoff(attempt)
+            else:
+                now = tracing.complete(f"GET {response.url}", "http", start, status=response.status_code,
+                                       attempt=attempt, bytes_read=len(response.content))
+                tracing.observe("http_latency", (now - start) / 1e9)
+                self._update_budget(response)
+                wait = self._rate_limit_wait(response, attempt)
+                if wait is not None:
+                    # 限流针对整个令牌，所有线程一起暂停
+                    self._pause_all(wait)
+                    wait = 0.0
+                elif response.status_code in RETRY_STATUS:
+                    wait = self._backoff(attempt)
+                else:
+                    return response
+                if attempt >= self.max_retries:
+                    return response
+
+            attempt += 1
+            with self.lock:
+                self.retries += 1
+            print(f"Retrying {url} (attempt {attempt})")
+            self._sleep(wait)
+
+    def summary(self):
+        remaining = "unknown" if self.remaining is None else self.remaining
+        return (f"Requests: {self.requests}, retries: {self.retries}, "
+                f"waited {self.wait_seconds:.1f}s, remaining budget: {remaining}")
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
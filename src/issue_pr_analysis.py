@@ -1,12 +1,23 @@
-import json
+import argparse
+import contextlib
+import math
+import os
 from datetime import datetime
-from collections import Counter
+from collections import Counter, defaultdict
 
+import data_store
 
-# 读取JSON数据
+
+# 逐条读取问题数据，支持 JSON / JSON Lines 文件和本地数据库（.db），不一次性载入全部数据
 def load_issues(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    if file_path.endswith(".db"):
+        store = data_store.open_store(file_path)
+        try:
+            yield from data_store.query_issues(store)
+        finally:
+            store.close()
+    else:
+        yield from data_store.iter_json_records(file_path)
 
 
 # 计算解决时间（秒）
@@ -16,49 +27,121 @@ def calculate_resolution_time(created_at, closed_at):
     return (closed_time - created_time).total_seconds()
 
 
-# 分析问题解决情况
-def analyze_issue_resolution(file_path):
-    issues = load_issues(file_path)
-
-    # 已解决和未解决的问题计数
-    resolved_count = 0
-    open_count = 0
-    total_resolution_time = 0
-    resolved_issues = 0
-
-    authors_close = [
-        issue["user"]["login"] for issue in issues if issue["state"] == "closed"
-    ]
-    authors = [issue["user"]["login"] for issue in issues]
-    author_close_counts = Counter(authors_close)
-    author_counts = Counter(authors)
-    # 遍历每个issue
-    for issue in issues:
-        # Track the author
-        # 分析已解决和未解决的问题
+class QuantileSketch:
+    """
+    固定相对误差的分位数草图：按对数分桶计数，桶的数量只与数值范围有关，与样本数无关。
+
+    返回的分位数与真实值的相对误差不超过 relative_accuracy。
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        """
+        :param relative_accuracy: 相对误差，如 0.01 表示 1%
+        """
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zero_count = 0  # 小于等于 0 的值（如创建后立即关闭）
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self.log_gamma)] += 1
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """
+        :param q: 0 到 1 之间的分位
+        :return: 分位数的估计值；没有数据时返回 None
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # 取桶区间 (gamma^(i-1), gamma^i] 的中点，保证相对误差
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class ResolutionStats:
+    """
+    一组问题（全部、某个标签或某个月份）的解决情况累加器。
+    """
+
+    def __init__(self):
+        self.resolved = 0
+        self.open = 0
+        self.total_resolution_time = 0
+        self.sketch = QuantileSketch()
+
+    def add(self, issue):
         if issue["state"] == "closed" and issue.get("closed_at"):
-            resolved_count += 1
-            resolution_time = calculate_resolution_time(
-                issue["created_at"], issue["closed_at"]
-            )
-            total_resolution_time += resolution_time
-            resolved_issues += 1
+            resolution_time = calculate_resolution_time(issue["created_at"], issue["closed_at"])
+            self.resolved += 1
+            self.total_resolution_time += resolution_time
+            self.sketch.add(resolution_time)
         elif issue["state"] == "open":
-            open_count += 1
+            self.open += 1
+
+    def resolution_rate(self):
+        total_issues = self.resolved + self.open
+        return (self.resolved / total_issues) * 100 if total_issues > 0 else 0
+
+    def summary(self):
+        """
+        :return: 解决率、平均和 p50 / p90 / p99 解决时间（小时）的说明文字
+        """
+        avg_resolution_time = self.total_resolution_time / self.resolved if self.resolved > 0 else 0
+        quantiles = " ".join(
+            f"p{round(q * 100)}={value / 3600:.2f}h" if value is not None else f"p{round(q * 100)}=-"
+            for q, value in ((q, self.sketch.quantile(q)) for q in (0.5, 0.9, 0.99))
+        )
+        return (f"解决率 {self.resolution_rate():.2f}%（{self.resolved}/{self.resolved + self.open}），"
+                f"平均 {avg_resolution_time / 3600:.2f}h，{quantiles}")
 
-    # 计算解决率
-    total_issues = resolved_count + open_count
-    resolution_rate = (resolved_count / total_issues) * 100 if total_issues > 0 else 0
 
-    # 计算平均解决时间
-    avg_resolution_time = (
-        total_resolution_time / resolved_issues if resolved_issues > 0 else 0
-    )
-    avg_resolution_time_hours = avg_resolution_time / 3600  # 转换为小时
+# 分析问题解决情况：单次遍历，同时更新全局、作者、标签和月份的统计
+def analyze_issue_resolution(file_path):
+    overall = ResolutionStats()
+    by_label = defaultdict(ResolutionStats)
+    by_month = defaultdict(ResolutionStats)
+    author_counts = Counter()
+    author_close_counts = Counter()
+
+    # 遍历每个issue
+    for issue in load_issues(file_path):
+        # Track the author
+        author = issue["user"]["login"]
+        author_counts[author] += 1
+        if issue["state"] == "closed":
+            author_close_counts[author] += 1
 
-    # 打印解决率和平均解决时间
-    print(f"解决率: {resolution_rate:.2f}%")
-    print(f"平均解决时间: {avg_resolution_time_hours:.2f} 小时")
+        # 分析已解决和未解决的问题
+        overall.add(issue)
+        for label in issue.get("labels") or []:
+            by_label[label["name"] if isinstance(label, dict) else label].add(issue)
+        by_month[issue["created_at"][:7]].add(issue)
+
+    # 打印解决率和解决时间
+    print(f"解决率: {overall.resolution_rate():.2f}%")
+    avg_resolution_time = overall.total_resolution_time / overall.resolved if overall.resolved > 0 else 0
+    print(f"平均解决时间: {avg_resolution_time / 3600:.2f} 小时")
+    for q in (0.5, 0.9, 0.99):
+        value = overall.sketch.quantile(q)
+        if value is not None:
+            print(f"p{round(q * 100)} 解决时间: {value / 3600:.2f} 小时")
 
     # 问题解决率大于等于75%视为提出高质量问题作者
     high_efficiency_author = 0
@@ -76,10 +159,30 @@ def analyze_issue_resolution(file_path):
 
         print(f"{author}: 问题解决率:{author_resolution_rate:.2f}%")
 
-    high_efficiency_author_rate = high_efficiency_author / len(author)
+    high_efficiency_author_rate = high_efficiency_author / len(author_counts) * 100 if author_counts else 0
     print(f"高质量作者比例:{high_efficiency_author_rate:.2f}%")
 
-
-# 示例：调用函数并分析数据
-file_path = "./data/issue_info.json"
-analyze_issue_resolution(file_path)
+    # 按标签和月份输出
+    print("\n按标签统计:")
+    for label, stats in sorted(by_label.items(), key=lambda item: -(item[1].resolved + item[1].open)):
+        print(f"{label}: {stats.summary()}")
+
+    print("\n按月份统计:")
+    for month, stats in sorted(by_month.items()):
+        print(f"{month}: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分析 Issue 的解决情况")
+    parser.add_argument("file", nargs="?", default="./data/issue_info.json",
+                        help="issue_info.json / .jsonl 或本地数据库 .db")
+    parser.add_argument("-o", "--output", help="把分析结果写入该文件（默认输出到终端）")
+    args = parser.parse_args()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f, contextlib.redirect_stdout(f):
+            analyze_issue_resolution(args.file)
+        print(f"Issue analysis saved to {args.output}")
+    else:
+        analyze_issue_resolution(args.file)
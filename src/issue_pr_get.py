@@ -1,44 +1,340 @@
+import argparse
+import atexit
+import hashlib
 import requests
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from requests.adapters import HTTPAdapter
+
+import data_store
+import tracing
+from github_scheduler import RequestScheduler
 
 GITHUB_API_URL = "https://api.github.com"
 REPO_OWNER = "BeyondDimension"
 REPO_NAME = "SteamTools"
 ACCESS_TOKEN = "114514"
+PER_PAGE = 100
+MAX_IN_FLIGHT = 8  # 同时进行的请求数上限
+SYNC_STATE_FILE = "./data/issue_sync_state.json"
+CHECKPOINT_DIR = "./data/checkpoints"
+
+
+def create_session(pool_size=MAX_IN_FLIGHT):
+    """
+    创建带连接池的会话，所有分页请求复用连接，并由 RequestScheduler 处理限流和重试。
+
+    :param pool_size: 连接池大小，应不小于并发请求数
+    :return: RequestScheduler，用法与 requests.Session 相同
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Authorization"] = f"token {ACCESS_TOKEN}"
+    return RequestScheduler(session)
+
+
+def last_page_number(response):
+    """
+    从响应的 Link 头中读取最后一页的页码。
+
+    :param response: 第一页的响应
+    :return: 最后一页的页码；没有 rel="last" 时返回 None
+    """
+    last = response.links.get("last")
+    if last is None:
+        return None
+    pages = parse_qs(urlparse(last["url"]).query).get("page")
+    return int(pages[0]) if pages else None
+
+
+def fetch_page(session, url, params, page):
+    """
+    :return: (页码, 响应)
+    """
+    return page, session.get(url, params={**params, "page": page, "per_page": PER_PAGE})
+
+
+def checkpoint_file(checkpoint_dir, url, params):
+    key = json.dumps([url, sorted(params.items())], ensure_ascii=False)
+    return os.path.join(checkpoint_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".jsonl")
+
+
+def listing_fingerprint(response):
+    """
+    第一页的指纹：优先使用 ETag，没有 ETag 时使用响应内容的哈希。
+    列表中新增或删除记录会使各页内容整体移动，第一页随之变化。
+
+    :param response: 第一页的响应
+    :return: 指纹字符串
+    """
+    return response.headers.get("ETag") or hashlib.sha1(response.content).hexdigest()
+
+
+def load_checkpoint(path, fingerprint):
+    """
+    读取检查点中已完整获取的页面。
+
+    :param path: 检查点文件（第一行为 {"fingerprint": 第一页指纹}，之后每行一页：{"page": 页码, "items": [...]}）
+    :param fingerprint: 本次第一页的指纹，与检查点记录的不一致时说明列表已变化，丢弃检查点
+    :return: 从第 1 页起连续的各页数据列表
+    """
+    pages = []
+    if path is None or not os.path.exists(path):
+        return pages
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return pages
+        if header.get("fingerprint") != fingerprint:
+            print(f"Listing changed since checkpoint {path}, restarting from page 1")
+            return pages
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # 上次中断时写了一半的行
+            if record["page"] != len(pages) + 1:
+                break
+            pages.append(record["items"])
+    return pages
+
+
+def get_all_items(url, params=None, session=None, max_in_flight=MAX_IN_FLIGHT, checkpoint_dir=None):
+    """
+    获取分页接口的全部数据。
+
+    先请求第一页，从 Link 头得到总页数，再并发请求其余页面，结果按页码顺序拼接。
+    指定 checkpoint_dir 时，每获取完一页就追加到检查点文件；中途失败后再次运行会从检查点之后的页面继续，
+    全部完成后删除检查点。检查点记录第一页的指纹，列表在两次运行之间发生变化时从头获取，
+    避免拼接不同时间获取的、已经错位的页面。
+
+    :param url: 接口地址
+    :param params: 查询参数
+    :param session: 复用的会话，默认新建一个带连接池的会话
+    :param max_in_flight: 同时进行的请求数上限
+    :param checkpoint_dir: 检查点目录
+    :return: 全部数据列表；某一页在重试后仍然失败时返回 None
+    """
+    params = dict(params or {})
+    own_session = session is None
+    if own_session:
+        session = create_session(max_in_flight)
+    checkpoint_path = checkpoint_file(checkpoint_dir, url, params) if checkpoint_dir else None
+
+    try:
+        _, response = fetch_page(session, url, params, 1)
+        if response.status_code != 200:
+            print(f"Failed to fetch data from GitHub API: {response.status_code}")
+            return None
 
+        last_page = last_page_number(response)
+        if last_page is None:
+            # 没有 Link 头（单页或不支持的接口）：沿 rel="next" 逐页请求
+            items = response.json()
+            while "next" in response.links:
+                response = session.get(response.links["next"]["url"])
+                if response.status_code != 200:
+                    print(f"Failed to fetch data from GitHub API: {response.status_code}")
+                    return None
+                items.extend(response.json())
+            return items
+
+        fingerprint = listing_fingerprint(response)
+        pages = load_checkpoint(checkpoint_path, fingerprint)[:last_page]
+        if pages:
+            print(f"Resuming {url} from checkpoint: {len(pages)}/{last_page} pages")
+        else:
+            pages.append(response.json())
+        checkpoint = None
+        if checkpoint_path is not None:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            checkpoint = open(checkpoint_path, "w", encoding="utf-8")
+            checkpoint.write(json.dumps({"fingerprint": fingerprint}) + "\n")
+            for page, page_items in enumerate(pages, 1):
+                checkpoint.write(json.dumps({"page": page, "items": page_items}, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        try:
+            responses = executor.map(lambda page: fetch_page(session, url, params, page),
+                                     range(len(pages) + 1, last_page + 1))
+            # map 按页码顺序返回结果，检查点中始终是连续的页面
+            for page, response in responses:
+                if response.status_code != 200:
+                    print(f"Failed to fetch data from GitHub API: {response.status_code} (page {page})")
+                    return None
+                pages.append(response.json())
+                if checkpoint is not None:
+                    checkpoint.write(json.dumps({"page": page, "items": pages[-1]}, ensure_ascii=False) + "\n")
+                    checkpoint.flush()
+        finally:
+            # 失败时取消尚未发出的请求
+            executor.shutdown(cancel_futures=True)
+            if checkpoint is not None:
+                checkpoint.close()
+
+        if checkpoint_path is not None:
+            os.remove(checkpoint_path)
+        return [item for page_items in pages for item in page_items]
+    finally:
+        if own_session:
+            session.close()
+
+
+def get_issues_and_prs(repo_owner, repo_name, base_url=GITHUB_API_URL, max_in_flight=MAX_IN_FLIGHT):
+    """
+    :param repo_owner: 仓库所有者
+    :param repo_name: 仓库名
+    :param base_url: API 地址，可指向本地的模拟服务器
+    :param max_in_flight: 同时进行的请求数上限
+    :return: (issues, prs)；获取失败时对应的值为 None
+    """
+    issues_url = f"{base_url}/repos/{repo_owner}/{repo_name}/issues"
+    prs_url = f"{base_url}/repos/{repo_owner}/{repo_name}/pulls"
+
+    with create_session(max_in_flight) as session:
+        with tracing.span("fetch issues"):
+            issues = get_all_items(issues_url, params={"state": "all", "filter": "all"},
+                                   session=session, max_in_flight=max_in_flight, checkpoint_dir=CHECKPOINT_DIR)
+        with tracing.span("fetch pulls"):
+            prs = get_all_items(prs_url, params={"state": "all"}, session=session, max_in_flight=max_in_flight,
+                                checkpoint_dir=CHECKPOINT_DIR)
+        print(session.summary())
+
+    # 过滤掉 pull requests
+    if issues is not None:
+        issues = [issue for issue in issues if "pull_request" not in issue]
+
+    return issues, prs
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fetch_updated_items(session, url, params, since, known, sync_state):
+    """
+    按更新时间倒序获取 since 之后更新过的记录。
+
+    第一页带 If-None-Match 发送条件请求：任何记录更新后都会排到第一页，
+    因此第一页返回 304 即说明上次同步以来没有变化，不再继续请求。
+    第一页的地址不含水位线，每个接口只保存一个 ETag，水位线移动后仍然有效。
+
+    :param session: 会话
+    :param url: 接口地址
+    :param params: 查询参数
+    :param since: 水位线（ISO 时间字符串），只需要 updated_at 不早于它的记录
+    :param known: {编号: updated_at}，已保存且没有变化的记录不再返回（水位线上的记录每次都会出现在结果中）
+    :param sync_state: 该接口的同步状态，读取并更新其中的 "etag"
+    :return: 更新过的记录列表；请求失败时返回 None
+    """
+    params = {**params, "sort": "updated", "direction": "desc", "per_page": PER_PAGE}
+    headers = {"If-None-Match": sync_state["etag"]} if sync_state.get("etag") else {}
+    response = session.get(url, params=params, headers=headers)
+    if response.status_code == 304:
+        return []
+    if response.status_code == 200 and "ETag" in response.headers:
+        sync_state["etag"] = response.headers["ETag"]
 
-def get_all_items(url, params=None):
     items = []
-    page = 1
-    headers = {"Authorization": f"token {ACCESS_TOKEN}"}
     while True:
-        if params is None:
-            params = {}
-        params.update({"page": page, "per_page": 100})
-        response = requests.get(url, headers=headers, params=params)
         if response.status_code != 200:
             print(f"Failed to fetch data from GitHub API: {response.status_code}")
-            break
+            return None
         page_items = response.json()
-        if not page_items:
-            break
-        items.extend(page_items)
-        page += 1
-    return items
+        items.extend(item for item in page_items
+                     if item["updated_at"] >= since and known.get(item["number"]) != item["updated_at"])
+        # 倒序排列：出现早于水位线的记录后，后续页面都不需要了
+        if not page_items or page_items[-1]["updated_at"] < since or "next" not in response.links:
+            return items
+        response = session.get(response.links["next"]["url"])
 
 
-def get_issues_and_prs(repo_owner, repo_name):
-    issues_url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues"
-    prs_url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/pulls"
+def merge_by_number(records, updates):
+    """
+    按编号把更新合并进已有数据，结果按编号倒序排列（与 API 默认顺序一致）。
 
-    issues = get_all_items(issues_url, params={"state": "all", "filter": "all"})
-    prs = get_all_items(prs_url, params={"state": "all"})
+    :param records: 已有记录列表
+    :param updates: 更新的记录列表
+    :return: 合并后的记录列表
+    """
+    merged = {record["number"]: record for record in records}
+    merged.update((record["number"], record) for record in updates)
+    return [merged[number] for number in sorted(merged, reverse=True)]
 
-    # 过滤掉 pull requests
-    issues = [issue for issue in issues if "pull_request" not in issue]
 
-    return issues, prs
+def sync_issues_and_prs(repo_owner, repo_name, base_url=GITHUB_API_URL, max_in_flight=MAX_IN_FLIGHT,
+                        state_path=SYNC_STATE_FILE):
+    """
+    增量同步 Issue 和 PR：只获取水位线之后更新过的记录，按编号合并进 issue_info.json / pr_info.json。
+
+    状态文件记录每类数据的水位线（已同步记录中最大的 updated_at）和第一页的 ETag；
+    没有状态文件或数据文件时先完整获取一次。
+
+    :param repo_owner: 仓库所有者
+    :param repo_name: 仓库名
+    :param base_url: API 地址
+    :param max_in_flight: 完整获取时同时进行的请求数上限
+    :param state_path: 同步状态文件路径
+    :return: (全部 issues, 全部 prs, 本次更新的 issues, 本次更新的 prs)；请求失败时返回 None
+    """
+    state = load_json(state_path, {})
+    issues = load_json("./data/issue_info.json", None)
+    prs = load_json("./data/pr_info.json", None)
+
+    if not state or issues is None or prs is None:
+        print("No sync state, fetching all issues and pull requests")
+        issues, prs = get_issues_and_prs(repo_owner, repo_name, base_url, max_in_flight)
+        if issues is None or prs is None:
+            return None
+        updated_issues, updated_prs = issues, prs
+        state = {"issues": {}, "pulls": {}}
+    else:
+        for kind_state in state.values():
+            kind_state.pop("etags", None)  # 旧版本按完整地址（含水位线）保存的 ETag，已不再使用
+        with create_session(max_in_flight) as session:
+            # 两个接口都按更新时间倒序读取、在水位线处截断；issues 接口的结果中也包含 PR
+            issues_state = state["issues"]
+            with tracing.span("sync issues"):
+                updated_issues = fetch_updated_items(
+                    session, f"{base_url}/repos/{repo_owner}/{repo_name}/issues",
+                    {"state": "all", "filter": "all"}, issues_state["since"],
+                    {issue["number"]: issue["updated_at"] for issue in issues}, issues_state)
+            pulls_state = state["pulls"]
+            with tracing.span("sync pulls"):
+                updated_prs = fetch_updated_items(
+                    session, f"{base_url}/repos/{repo_owner}/{repo_name}/pulls",
+                    {"state": "all"}, pulls_state["since"], {pr["number"]: pr["updated_at"] for pr in prs},
+                    pulls_state)
+            print(session.summary())
+        if updated_issues is None or updated_prs is None:
+            return None
+
+        # 过滤掉 pull requests
+        updated_issues = [issue for issue in updated_issues if "pull_request" not in issue]
+        issues = merge_by_number(issues, updated_issues)
+        prs = merge_by_number(prs, updated_prs)
+        print(f"Updated {len(updated_issues)} issues and {len(updated_prs)} pull requests")
+
+    state["issues"]["since"] = max((issue["updated_at"] for issue in issues), default="1970-01-01T00:00:00Z")
+    state["pulls"]["since"] = max((pr["updated_at"] for pr in prs), default="1970-01-01T00:00:00Z")
+
+    save_data_to_json(issues, "issue_info.json")
+    save_data_to_json(prs, "pr_info.json")
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, state_path)
+    return issues, prs, updated_issues, updated_prs
 
 
 def analyze_issues(issues):
@@ -65,14 +361,39 @@ def save_data_to_json(data, filename):
     os.makedirs("./data", exist_ok=True)
     with open(f"./data/{filename}", "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
+    tracing.count_bytes("written", os.path.getsize(f"./data/{filename}"))
 
 
 if __name__ == "__main__":
-    issues, prs = get_issues_and_prs(REPO_OWNER, REPO_NAME)
+    parser = argparse.ArgumentParser(description="获取仓库的 Issue 和 Pull Request")
+    parser.add_argument("--store", nargs="?", const=data_store.DEFAULT_STORE_PATH,
+                        help="同时写入本地 SQLite 数据库（默认 ./data/analysis.db）")
+    parser.add_argument("--base-url", default=GITHUB_API_URL, help="GitHub API 地址")
+    parser.add_argument("-j", "--jobs", type=int, default=MAX_IN_FLIGHT, help="同时进行的请求数上限")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：只获取上次同步以来更新过的记录，按编号合并进已有数据")
+    parser.add_argument("--trace", help="记录各阶段和每个 HTTP 请求的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
+    if args.incremental:
+        result = sync_issues_and_prs(REPO_OWNER, REPO_NAME, args.base_url, args.jobs)
+        issues, prs, updated_issues, updated_prs = result if result is not None else (None, None, [], [])
+    else:
+        issues, prs = get_issues_and_prs(REPO_OWNER, REPO_NAME, args.base_url, args.jobs)
+        updated_issues, updated_prs = issues, prs
+        if issues is not None and prs is not None:
+            save_data_to_json(issues, "issue_info.json")
+            save_data_to_json(prs, "pr_info.json")
 
     if issues is not None and prs is not None:
         analyze_issues(issues)
         analyze_prs(prs)
 
-        save_data_to_json(issues, "issue_info.json")
-        save_data_to_json(prs, "pr_info.json")
+        if args.store:
+            store = data_store.open_store(args.store)
+            data_store.upsert_issues(store, updated_issues)
+            data_store.upsert_pulls(store, updated_prs)
+            store.close()
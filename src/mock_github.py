@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class MockGitHubServer(ThreadingHTTPServer):
+    """
+    本地模拟的 GitHub API，只实现 issue_pr_get 用到的两个接口：
+    /repos/{owner}/{repo}/issues 和 /repos/{owner}/{repo}/pulls。
+
+    支持分页与 Link 头、issues 的 since 参数、sort=updated 排序、ETag 条件请求、
+    X-RateLimit-* 头，并可按比例注入 403 / 429 / 5xx 错误，用于离线测试和基准测试。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, issues, pulls, port=0, latency=0.0, fail_rate=0.0, rate_limit=5000, seed=0):
+        """
+        :param issues: issue 记录列表（可以包含带 pull_request 字段的记录，与真实接口一致）
+        :param pulls: pull request 记录列表
+        :param port: 监听端口，0 表示自动分配
+        :param latency: 每个请求的额外延迟（秒）
+        :param fail_rate: 注入错误的比例
+        :param rate_limit: 每小时的请求额度
+        :param seed: 错误注入的随机种子
+        """
+        super().__init__(("127.0.0.1", port), MockGitHubHandler)
+        self.data = {"issues": issues, "pulls": pulls}
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset_at = int(time.time()) + 3600
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "not_modified": 0, "injected": 0, "bytes": 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        kind = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if kind not in server.data:
+            return self.send(404, b'{"message": "Not Found"}')
+
+        with server.lock:
+            server.stats["requests"] += 1
+            if time.time() >= server.reset_at:
+                server.remaining = server.rate_limit
+                server.reset_at = int(time.time()) + 3600
+            server.remaining = max(server.remaining - 1, 0)
+            rate_headers = {"X-RateLimit-Limit": server.rate_limit, "X-RateLimit-Remaining": server.remaining,
+                            "X-RateLimit-Reset": server.reset_at}
+            injected = server.random.random() < server.fail_rate
+            fault = server.random.choice(("403", "429", "5xx")) if injected else None
+        if server.latency:
+            time.sleep(server.latency)
+
+        if fault is not None:
+            with server.lock:
+                server.stats["injected"] += 1
+            if fault == "403":
+                return self.send(403, b'{"message": "You have exceeded a secondary rate limit."}',
+                                 {**rate_headers, "Retry-After": 0.1})
+            if fault == "429":
+                return self.send(429, b"", {**rate_headers, "Retry-After": 0.1})
+            return self.send(server.random.choice((500, 502, 503)), b"", rate_headers)
+
+        items = server.data[kind]
+        if kind == "issues" and "since" in query:
+            items = [item for item in items if item["updated_at"] >= query["since"]]
+        if query.get("sort") == "updated":
+            items = sorted(items, key=lambda item: item["updated_at"], reverse=query.get("direction") != "asc")
+        else:
+            items = sorted(items, key=lambda item: item["number"], reverse=True)
+
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 30))
+        last_page = max(1, (len(items) + per_page - 1) // per_page)
+        body = json.dumps(items[(page - 1) * per_page:page * per_page], ensure_ascii=False).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.stats["not_modified"] += 1
+            return self.send(304, b"", {**rate_headers, "ETag": etag})
+
+        def page_url(number):
+            return f"{server.base_url}{url.path}?{urlencode({**query, 'page': number})}"
+
+        links = []
+        if page < last_page:
+            links.append(f'<{page_url(page + 1)}>; rel="next"')
+        if last_page > 1:
+            links.append(f'<{page_url(last_page)}>; rel="last"')
+        headers = {**rate_headers, "ETag": etag, "Content-Type": "application/json"}
+        if links:
+            headers["Link"] = ", ".join(links)
+        with server.lock:
+            server.stats["ok"] += 1
+            server.stats["bytes"] += len(body)
+        self.send(200, body, headers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动本地模拟的 GitHub API（issues / pulls 接口）")
+    parser.add_argument("--issues", default="./data/issue_info.json", help="issue 数据文件")
+    parser.add_argument("--prs", default="./data/pr_info.json", help="pull request 数据文件")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的额外延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="注入 403 / 429 / 5xx 错误的比例")
+    args = parser.parse_args()
+
+    with open(args.issues, "r", encoding="utf-8") as f:
+        issues = json.load(f)
+    with open(args.prs, "r", encoding="utf-8") as f:
+        pulls = json.load(f)
+    server = MockGitHubServer(issues, pulls, args.port, args.latency, args.fail_rate)
+    print(f"Mock GitHub API listening on {server.base_url}")
+    server.serve_forever()
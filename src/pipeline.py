@@ -0,0 +1,315 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import tracing
+from analysis_cache import file_sha256
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 各脚本的 ./data、./results 等相对路径都以项目根目录为准
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+STATE_FILE = os.path.join("results", "pipeline", "state.json")
+LOG_DIR = os.path.join("results", "pipeline")
+
+
+class Stage:
+    """
+    流水线中的一个阶段：一条命令及其声明的输入、输出和依赖。
+
+    输入指纹（输入文件内容、命令行和相关脚本源码的哈希）与上次成功运行时相同、且输出都存在时跳过该阶段。
+    """
+
+    def __init__(self, name, command, inputs=(), outputs=(), deps=(), code=(), volatile=False, parallel=False):
+        """
+        :param name: 阶段名称
+        :param command: 命令参数列表，在项目根目录下运行
+        :param inputs: 输入文件或目录（目录中的 .cs / .json 等文件全部参与指纹）
+        :param outputs: 输出文件，缺少任何一个时阶段视为需要重新运行
+        :param deps: 依赖的阶段名称，依赖全部完成后才开始
+        :param code: 与该阶段相关的脚本文件，脚本修改后阶段需要重新运行
+        :param volatile: 输入来自网络（如 GitHub API、git 远端），无法计算指纹，每次都运行
+        :param parallel: 命令接受 -j 进程数；运行时追加 -j，同时选中的此类阶段平分 CPU 核心，-j 不参与指纹
+        """
+        self.name = name
+        self.command = command
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.code = list(code)
+        self.volatile = volatile
+        self.parallel = parallel
+
+    def command_line(self, jobs):
+        """
+        :param jobs: 分配给该阶段的进程数（只用于 parallel 阶段）
+        :return: 实际运行的命令参数列表
+        """
+        return self.command + (["-j", str(jobs)] if self.parallel else [])
+
+    def fingerprint(self):
+        """
+        :return: 输入指纹；输入文件不存在时也参与计算（记为 missing）
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.command).encode())
+        for path in self.code + self.inputs:
+            for file_path in iter_input_files(path):
+                relative = os.path.relpath(file_path).replace(os.sep, "/")
+                content = file_sha256(file_path) if os.path.isfile(file_path) else "missing"
+                digest.update(f"{relative}\0{content}\n".encode())
+        return digest.hexdigest()
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+def iter_input_files(path):
+    """
+    :param path: 文件或目录
+    :return: 生成器，按确定的顺序产出文件路径；目录只包含源码和数据文件，路径不存在时原样产出
+    """
+    if not os.path.isdir(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in ("bin", "obj"))
+        for name in sorted(files):
+            if name.endswith((".cs", ".csproj", ".json", ".jsonl", ".dll")):
+                yield os.path.join(root, name)
+
+
+def script(name):
+    return os.path.join(SCRIPT_DIR, name)
+
+
+def default_stages(source_dir, github_url=None):
+    """
+    每晚运行的阶段图。
+
+    commits、issues、platform_scan、static_analysis 之间没有共同的输入，可以同时运行；
+    commit_activity、commit_churn 和 issue_analysis 分别等待各自的数据获取完成。
+    commits 和 issues 会同时写入 data/analysis.db，由 data_store 的忙等待超时保证不会因写锁失败。
+
+    :param source_dir: SteamTools 源码目录（静态分析和平台兼容性扫描的输入）
+    :param github_url: GitHub API 地址，为 None 时使用默认地址
+    :return: [Stage]
+    """
+    python = sys.executable
+    # 分析器由 static_analysis.py 按源码构建，指纹使用源码（iter_input_files 跳过 bin/ 和 obj/）
+    analyzer_dir = os.path.join("src", "static_analysis_cs")
+    issue_command = [python, script("issue_pr_get.py"), "--incremental", "--store"]
+    if github_url:
+        issue_command += ["--base-url", github_url]
+    return [
+        Stage("commits", [python, script("commit_analysis.py"), "--incremental", "--store"],
+              outputs=[os.path.join("data", "commit_info.jsonl")],
+              code=[script("commit_analysis.py")], volatile=True),
+        Stage("commit_activity", [python, script("commit_activity.py"), os.path.join("data", "commit_info.jsonl"),
+                                  "-o", "results"],
+              inputs=[os.path.join("data", "commit_info.jsonl")],
+              outputs=[os.path.join("results", "commit_hour_weekday_heatmap.png")],
+              deps=["commits"], code=[script("commit_activity.py"), script("chart_render.py")]),
+        Stage("commit_churn", [python, script("commit_churn.py"), "SteamTools", "--rev", "origin/develop"],
+              inputs=[os.path.join("data", "commit_sync_state.json")],
+              outputs=[os.path.join("results", "churn", "churn_files.csv")], parallel=True,
+              deps=["commits"], code=[script("commit_churn.py")]),
+        Stage("issues", issue_command,
+              outputs=[os.path.join("data", "issue_info.json"), os.path.join("data", "pr_info.json")],
+              code=[script("issue_pr_get.py"), script("github_scheduler.py")], volatile=True),
+        Stage("issue_analysis", [python, script("issue_pr_analysis.py"), os.path.join("data", "issue_info.json"),
+                                 "-o", os.path.join("results", "issue_analysis.txt")],
+              inputs=[os.path.join("data", "issue_info.json")],
+              outputs=[os.path.join("results", "issue_analysis.txt")],
+              deps=["issues"], code=[script("issue_pr_analysis.py")]),
+        Stage("platform_scan", [python, script("platform_compatibility_analysis.py"), source_dir,
+                                "-o", os.path.join("results", "output.txt")],
+              inputs=[source_dir], outputs=[os.path.join("results", "output.txt")], parallel=True,
+              code=[script("platform_compatibility_analysis.py"), script("cs_lexer.py")]),
+        Stage("static_analysis", [python, script("static_analysis.py"), "--source", source_dir],
+              inputs=[source_dir, analyzer_dir], parallel=True,
+              outputs=[os.path.join("results", "static_analysis", "final_static_analysis_report.pdf")],
+              code=[script("static_analysis.py"), script("analyzer_worker.py"), script("diagnostics_store.py")]),
+    ]
+
+
+def select_stages(stages, names):
+    """
+    :param stages: 全部阶段
+    :param names: 要运行的阶段名称，为空时运行全部阶段
+    :return: 要运行的阶段（包含所依赖的阶段），保持原有顺序
+    """
+    by_name = {stage.name: stage for stage in stages}
+    if not names:
+        return list(stages)
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in selected]
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_stage(stage, jobs=1, log_dir=LOG_DIR):
+    """
+    运行一个阶段，标准输出和标准错误写入 results/pipeline/<阶段名>.log。
+
+    :param jobs: 分配给该阶段的进程数
+    :return: 命令的返回码
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{stage.name}.log")
+    command = stage.command_line(jobs)
+    with tracing.span(stage.name, command=" ".join(command)), open(log_path, "w", encoding="utf-8") as log:
+        return subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL).returncode
+
+
+def run_pipeline(stages, force=False, offline=False, max_parallel=None, dry_run=False, jobs=1):
+    """
+    按依赖关系运行阶段：依赖都已完成的阶段立即开始，互不依赖的阶段并行运行；
+    输入指纹未变化且输出都存在的阶段直接跳过。
+
+    :param stages: 要运行的阶段
+    :param force: 忽略指纹，全部重新运行
+    :param offline: 跳过依赖网络的阶段（volatile），使用已有数据
+    :param max_parallel: 同时运行的阶段数上限，默认不限制
+    :param dry_run: 只输出每个阶段是否需要运行，不实际运行
+    :param jobs: CPU 核心总数，由可能同时运行的 parallel 阶段平分
+    :return: {阶段名称: "done" / "skipped" / "failed" / "blocked" / "would run"}
+    """
+    state = load_state()
+    state_lock = threading.Lock()
+    status = {}
+    pending = {stage.name: stage for stage in stages}
+    known = set(pending)
+    running = {}
+    # 平台扫描、静态分析等 CPU 密集的阶段会同时运行，各自使用全部核心会超额订阅
+    concurrent = len([stage for stage in stages if stage.parallel])
+    if max_parallel:
+        concurrent = min(concurrent, max_parallel)
+    stage_jobs = max(1, jobs // max(1, concurrent))
+
+    def decide(stage):
+        """
+        :return: (是否需要运行, 输入指纹, 原因)
+        """
+        if stage.volatile:
+            if offline:
+                return False, None, "offline"
+            return True, None, "volatile"
+        fingerprint = stage.fingerprint()
+        if force:
+            return True, fingerprint, "forced"
+        if state.get(stage.name) != fingerprint:
+            return True, fingerprint, "inputs changed"
+        if not stage.outputs_exist():
+            return True, fingerprint, "outputs missing"
+        return False, fingerprint, "up to date"
+
+    def execute(stage, fingerprint):
+        start = time.perf_counter()
+        returncode = run_stage(stage, stage_jobs)
+        seconds = time.perf_counter() - start
+        ok = returncode == 0 and stage.outputs_exist()
+        if ok and fingerprint is not None:
+            with state_lock:
+                state[stage.name] = fingerprint
+                save_state(state)
+        log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+        if ok:
+            print(f"[{stage.name}] done in {seconds:.1f}s")
+        else:
+            print(f"[{stage.name}] failed (exit code {returncode}) after {seconds:.1f}s, see {log_path}")
+        return ok
+
+    with ThreadPoolExecutor(max_workers=max_parallel or max(1, len(stages))) as executor:
+        while pending or running:
+            # 依赖都已完成（运行成功或跳过）的阶段可以开始；依赖失败的阶段不再运行
+            for name, stage in list(pending.items()):
+                deps = [dep for dep in stage.deps if dep in known]
+                if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                    status[name] = "blocked"
+                    print(f"[{name}] blocked by failed dependency")
+                    del pending[name]
+                elif all(status.get(dep) in ("done", "skipped", "would run") for dep in deps):
+                    del pending[name]
+                    needed, fingerprint, reason = decide(stage)
+                    if not needed:
+                        status[name] = "skipped"
+                        print(f"[{name}] skipped ({reason})")
+                    elif dry_run:
+                        status[name] = "would run"
+                        print(f"[{name}] would run ({reason}): {' '.join(stage.command_line(stage_jobs))}")
+                    else:
+                        print(f"[{name}] started ({reason})")
+                        running[executor.submit(execute, stage, fingerprint)] = name
+            if not running:
+                # 跳过的阶段可能让新的阶段就绪
+                if pending and all(any(status.get(dep) is None for dep in stage.deps if dep in known)
+                                   for stage in pending.values()):
+                    raise RuntimeError(f"Dependency cycle among stages: {', '.join(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                status[running.pop(future)] = "done" if future.result() else "failed"
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行完整的分析流水线：互不依赖的阶段并行运行，输入未变化的阶段直接跳过")
+    parser.add_argument("stages", nargs="*", help="只运行这些阶段（及其依赖），默认运行全部阶段")
+    parser.add_argument("--source", default=os.path.join("repo", "SteamTools", "src"),
+                        help="SteamTools 源码目录，相对于项目根目录（默认 repo/SteamTools/src）")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="进程数总预算，由同时运行的平台扫描、静态分析等阶段平分，0 表示使用全部 CPU 核心")
+    parser.add_argument("--max-parallel", type=int, help="同时运行的阶段数上限，默认不限制")
+    parser.add_argument("--force", action="store_true", help="忽略输入指纹，重新运行所有阶段")
+    parser.add_argument("--offline", action="store_true", help="跳过需要访问网络的阶段（拉取提交、获取 Issue 和 PR）")
+    parser.add_argument("--github-url", help="GitHub API 地址（例如 mock_github.py 启动的本地服务）")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要运行的阶段")
+    parser.add_argument("--list", action="store_true", help="列出所有阶段及其依赖")
+    parser.add_argument("--trace", help="记录各阶段的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)
+    all_stages = default_stages(args.source, args.github_url)
+    if args.list:
+        for stage in all_stages:
+            deps = f" (after {', '.join(stage.deps)})" if stage.deps else ""
+            print(f"{stage.name}{deps}{' [network]' if stage.volatile else ''}")
+        sys.exit(0)
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
+    start = time.perf_counter()
+    result = run_pipeline(select_stages(all_stages, args.stages), args.force, args.offline, args.max_parallel,
+                          args.dry_run, args.jobs or (os.cpu_count() or 1))
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{name} {outcome}" for name, outcome in result.items()))
+    sys.exit(1 if any(outcome in ("failed", "blocked") for outcome in result.values()) else 0)
@@ -1,108 +1,281 @@
+import argparse
+import atexit
+import csv
+import functools
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 
+import tracing
+from cs_lexer import lex
+from git_blobs import BlobReader, list_blobs, repo_subdir, resolve_revisions
 
-# 将输出写入文件的函数
-def write_to_file(message, file_path="output.txt"):
-    with open(file_path, "a", encoding="utf-8") as file:
-        file.write(message + "\n")
+# 扫描规则：每条规则对应一类平台兼容性问题
+class Rule:
+    def __init__(self, name, pattern, message, show_matches=True, context=None, literal=None):
+        """
+        :param name: 规则名称
+        :param pattern: 匹配问题代码的正则表达式（注册时预编译）
+        :param message: 发现问题时输出的提示，后面跟文件路径
+        :param show_matches: 是否逐条输出匹配内容；为 False 时只需判断是否存在匹配
+        :param context: 规则适用的上下文：code（去掉字符串和注释的代码）、string（每个字符串字面量的值）、
+                        comment（每条注释）、directive（每行预处理指令）；为 None 时匹配整个文件
+        :param literal: 匹配结果中必定包含的子串，不含该子串的片段不运行正则表达式
+        """
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.message = message
+        self.show_matches = show_matches
+        self.context = context
+        self.literal = literal
 
+    def find(self, code, lexed=None):
+        """
+        在文件内容中查找匹配，只在规则适用的上下文中匹配。
 
-# 递归扫描文件夹中的所有 .cs 文件
-def scan_all_cs_files(directory, output_file="output.txt"):
-    # 确保文件在开始时是空的
-    with open(output_file, "w", encoding="utf-8") as file:
-        file.write("扫描结果:\n\n")
+        :param code: 文件内容
+        :param lexed: lex(code) 的结果，为 None 时按需生成
+        :return: 匹配内容列表（含分组时为分组内容），没有问题时为空列表
+        """
+        if self.context is None:
+            segments = [code]
+        else:
+            segments = (lexed if lexed is not None else lex(code)).segments(self.context)
+        if self.literal is not None:
+            segments = [segment for segment in segments if self.literal in segment]
+        if self.show_matches:
+            return [match for segment in segments for match in self.pattern.findall(segment)]
+        for segment in segments:
+            match = self.pattern.search(segment)
+            if match:
+                return [match.group(0)]
+        return []
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".cs"):
-                file_path = os.path.join(root, file)
-                check_platform_specific_paths(file_path, output_file)
-                check_platform_specific_libraries(file_path, output_file)
-                check_os_system_calls(file_path, output_file)
-                check_preprocessor_directives(file_path, output_file)
 
+# 规则注册表，按注册顺序对每个文件执行
+RULES = []
 
-# 检查操作系统特定的路径分隔符
-def check_platform_specific_paths(code_path, output_file):
-    try:
-        with open(code_path, "r", encoding="utf-8", errors="ignore") as file:
-            code = file.read()
-    except UnicodeDecodeError:
-        write_to_file(f"无法解码文件（可能是编码问题）：{code_path}", output_file)
-        return
-
-    # 检查硬编码的Windows路径分隔符
-    windows_paths = re.findall(r"[A-Za-z]:\\(?:[\w]+\\)*[\w]+\.\w+", code)
-    if windows_paths:
-        write_to_file(f"发现 Windows 特定路径：{code_path}", output_file)
-        for path in windows_paths:
-            write_to_file(path, output_file)
-
-    # 检查硬编码的Unix路径分隔符
-    unix_paths = re.findall(r"/[^/]+(?:/[^/]+)+", code)
-    if unix_paths:
-        write_to_file(f"发现 Unix 特定路径：{code_path}", output_file)
-        for path in unix_paths:
-            write_to_file(path, output_file)
 
+def register_rule(rule):
+    """
+    注册一条扫描规则，新增检查只需注册规则，不会增加对文件的读取次数。
 
-# 检查操作系统相关函数调用
-def check_os_system_calls(code_path, output_file):
-    try:
-        with open(code_path, "r", encoding="utf-8", errors="ignore") as file:
-            code = file.read()
-    except UnicodeDecodeError:
-        write_to_file(f"无法解码文件（可能是编码问题）：{code_path}", output_file)
-        return
+    :param rule: Rule 实例
+    :return: 传入的规则
+    """
+    RULES.append(rule)
+    return rule
 
-    # 查找操作系统相关的函数调用
-    system_calls = re.findall(r"os\.(system|name|environ|chmod|stat|remove)", code)
-    if system_calls:
-        write_to_file(f"发现与操作系统相关的函数调用：{code_path}", output_file)
-        for call in system_calls:
-            write_to_file(call, output_file)
 
+# 检查操作系统特定的路径分隔符：只在字符串字面量中查找。每一级路径逐个字符匹配，字符集不含分隔符，
+# 各级之间的划分是唯一的，长字符串上不会出现嵌套量词的回溯。
+# 插值字符串中的表达式在字符串值中是占位符 {}，可以出现在路径的任意一级中，输出时保留占位符
+register_rule(Rule("windows_paths", r"[A-Za-z]:\\(?:(?:[\w .-]|\{\})+\\)*(?:\w|\{\})+\.\w+",
+                   "发现 Windows 特定路径", context="string", literal=":\\"))
+# 以 / 开头的绝对路径，至少两级；/ 前面是字母、数字、:、/ 或 . 时不算（排除 URL、MIME 类型、日期格式等），
+# 以插值表达式开头时（如 $"{root}/lib/a.so"）从占位符开始输出
+register_rule(Rule("unix_paths", r"(?:\{\})?/(?<![\w:/.]/)(?:[\w.+@-]|\{\})+(?:/(?:[\w.+@-]|\{\})+)+/?",
+                   "发现 Unix 特定路径", context="string", literal="/"))
 
 # 检查平台特定的库引用
-def check_platform_specific_libraries(code_path, output_file):
+register_rule(Rule("windows_libraries", r"using\s+System\.Windows", "发现 Windows 特有的库", show_matches=False,
+                   context="code", literal="System.Windows"))
+register_rule(Rule("mono_libraries", r"using\s+Mono\.", "发现 Mono 特有的库", show_matches=False, context="code",
+                   literal="Mono."))
+
+# 检查操作系统相关函数调用
+register_rule(Rule("os_system_calls", r"\bos\.(system|name|environ|chmod|stat|remove)", "发现与操作系统相关的函数调用",
+                   context="code", literal="os."))
+
+# 检查条件编译指令：只在预处理指令行中查找，输出 #if / #elif 的完整条件
+register_rule(Rule("preprocessor_directives", r"^#\s*(?:if|elif)\s+(.*?)\s*(?://.*)?$", "发现条件编译指令",
+                   context="directive"))
+
+
+# 读取源文件内容：词法扫描需要完整的字符串，一次读入后解码
+def read_source(code_path):
+    with open(code_path, "rb") as file:
+        data = file.read()
+    tracing.count_bytes("read", len(data))
+    return data.decode("utf-8", errors="ignore")
+
+
+# 对一份代码运行所有规则，结果与文件路径无关，可按内容复用
+def scan_code(code, rules=None):
+    """
+    :param code: 文件内容
+    :param rules: 要执行的规则，默认使用全部已注册规则
+    :return: [(规则名称, 需要输出的匹配内容列表)]
+    """
+    findings = []
+    lexed = lex(code)  # 每个文件只做一次词法扫描，所有规则共用
+    for rule in rules if rules is not None else RULES:
+        matches = rule.find(code, lexed)
+        if matches:
+            findings.append((rule.name, matches if rule.show_matches else []))
+    return findings
+
+
+# 将扫描结果格式化为输出行
+def format_findings(code_path, findings, rules=None):
+    messages = {rule.name: rule.message for rule in (rules if rules is not None else RULES)}
+    lines = []
+    for name, matches in findings:
+        lines.append(f"{messages[name]}：{code_path}")
+        lines.extend(matches)
+    return lines
+
+
+# 扫描单个文件：文件只读取一次，所有规则在同一份内容上运行
+def scan_file(code_path, rules=None):
+    """
+    :param code_path: .cs 文件路径
+    :param rules: 要执行的规则，默认使用全部已注册规则
+    :return: 该文件的输出行列表
+    """
     try:
-        with open(code_path, "r", encoding="utf-8", errors="ignore") as file:
-            code = file.read()
-    except UnicodeDecodeError:
-        write_to_file(f"无法解码文件（可能是编码问题）：{code_path}", output_file)
-        return
+        code = read_source(code_path)
+    except OSError:
+        return [f"无法读取文件：{code_path}"]
+    return format_findings(code_path, scan_code(code, rules), rules)
+
 
-    # 检查 Windows 特有的库引用
-    windows_libraries = re.findall(r"using\s+System\.Windows", code)
-    if windows_libraries:
-        write_to_file(f"发现 Windows 特有的库：{code_path}", output_file)
+# 在子进程中扫描文件，并把耗时和读取字节数一起带回父进程
+def traced_scan_file(code_path, rules=None):
+    return tracing.traced_call("file", code_path, scan_file, code_path, rules)
 
-    # 检查 Mono 库引用
-    mono_libraries = re.findall(r"using\s+Mono\.", code)
-    if mono_libraries:
-        write_to_file(f"发现 Mono 特有的库：{code_path}", output_file)
 
+# 按确定的顺序（目录和文件名排序）列出文件夹中的所有 .cs 文件
+def find_cs_files(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".cs"):
+                yield os.path.join(root, name)
 
-# 检查条件编译指令
-def check_preprocessor_directives(code_path, output_file):
+
+# 递归扫描文件夹中的所有 .cs 文件
+def scan_all_cs_files(directory, output_file="output.txt", rules=None, jobs=1):
+    """
+    :param directory: 要扫描的根目录
+    :param output_file: 输出文件路径
+    :param rules: 要执行的规则，默认使用全部已注册规则
+    :param jobs: 并行扫描的进程数，大于 1 时把文件分发到进程池，结果仍按文件顺序写出
+    """
+    if rules is None:
+        rules = list(RULES)
+
+    # 整个扫描只打开一次输出文件，写入经过缓冲
+    with tracing.span("platform scan", directory=directory, jobs=jobs), \
+            open(output_file, "w", encoding="utf-8", buffering=1 << 20) as file:
+        file.write("扫描结果:\n\n")
+
+        code_paths = find_cs_files(directory)
+        traced = tracing.enabled()
+        if jobs > 1:
+            # 规则随任务一起传给子进程，运行时注册的规则同样生效
+            executor = ProcessPoolExecutor(max_workers=jobs)
+            results = executor.map(functools.partial(traced_scan_file if traced else scan_file, rules=rules),
+                                   code_paths, chunksize=16)
+        else:
+            executor = None
+            results = ((traced_scan_file if traced else scan_file)(code_path, rules) for code_path in code_paths)
+
+        try:
+            # map 按提交顺序返回结果，输出顺序与串行扫描一致
+            for lines in results:
+                if traced:
+                    lines, event = lines
+                    tracing.add_event(event)
+                for line in lines:
+                    file.write(line + "\n")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    tracing.count_bytes("written", os.path.getsize(output_file))
+
+
+# 直接从 git 对象库扫描历史修订，同一个 blob 只扫描一次
+def scan_revisions(repo_path, revisions, output_file=None, trend_file=None, rules=None, jobs=1, subdir=None):
+    """
+    :param repo_path: git 仓库路径
+    :param revisions: [(提交哈希, 提交时间)]，由 resolve_revisions 得到
+    :param output_file: 只扫描一个修订时写出完整的扫描结果，路径形如 提交:文件路径
+    :param trend_file: 趋势 CSV 路径，每个修订一行，记录各规则命中的文件数
+    :param rules: 要执行的规则，默认使用全部已注册规则
+    :param jobs: 并行扫描的进程数
+    :param subdir: 只扫描仓库中该子目录下的文件
+    """
+    if rules is None:
+        rules = list(RULES)
+
+    findings_by_oid = {}  # blob OID -> 扫描结果
+    trend = []
+    # 使用 spawn 启动子进程：fork 出的子进程会继承 git cat-file 的管道，导致其无法退出
+    executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) \
+        if jobs > 1 else None
     try:
-        with open(code_path, "r", encoding="utf-8", errors="ignore") as file:
-            code = file.read()
-    except UnicodeDecodeError:
-        write_to_file(f"无法解码文件（可能是编码问题）：{code_path}", output_file)
-        return
-
-    # 查找条件编译指令
-    preprocessor_directives = re.findall(r"#if\s+([A-Za-z]+)", code)
-    if preprocessor_directives:
-        write_to_file(f"发现条件编译指令：{code_path}", output_file)
-        for directive in preprocessor_directives:
-            write_to_file(directive, output_file)
-
-
-# 运行扫描
-directory_path = "../SteamTools"  # 你的项目根目录路径
-output_file = "./results/output.txt"  # 输出文件名
-scan_all_cs_files(directory_path, output_file)
+        with BlobReader(repo_path) as reader:
+            for commit, date in revisions:
+                blobs = list_blobs(repo_path, commit, subdir)
+
+                # 只读取和扫描此前没有见过的 blob
+                new_oids = list(dict.fromkeys(oid for _, oid in blobs if oid not in findings_by_oid))
+                codes = (reader.read_text(oid) for oid in new_oids)
+                with tracing.span(f"revision {commit[:12]}", files=len(blobs), new_blobs=len(new_oids)):
+                    if executor is not None:
+                        results = executor.map(functools.partial(scan_code, rules=rules), codes, chunksize=16)
+                    else:
+                        results = (scan_code(code, rules) for code in codes)
+                    findings_by_oid.update(zip(new_oids, results))
+                print(f"{commit[:12]} {date}: {len(blobs)} files, {len(new_oids)} new blobs scanned")
+
+                counts = {rule.name: 0 for rule in rules}
+                for _, oid in blobs:
+                    for name, _ in findings_by_oid[oid]:
+                        counts[name] += 1
+                trend.append({"commit": commit, "date": date, "files": len(blobs), **counts})
+
+                if output_file is not None and len(revisions) == 1:
+                    with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as file:
+                        file.write("扫描结果:\n\n")
+                        for path, oid in blobs:
+                            for line in format_findings(f"{commit[:12]}:{path}", findings_by_oid[oid], rules):
+                                file.write(line + "\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if trend_file is not None:
+        with open(trend_file, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["commit", "date", "files"] + [rule.name for rule in rules])
+            writer.writeheader()
+            writer.writerows(trend)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="扫描 C# 代码中潜在的平台兼容性问题")
+    parser.add_argument("directory", nargs="?", default="../SteamTools", help="项目根目录路径")
+    parser.add_argument("-o", "--output", default="./results/output.txt", help="输出文件名")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="并行扫描的进程数，0 表示使用全部 CPU 核心（默认 1，即串行）")
+    revision = parser.add_mutually_exclusive_group()
+    revision.add_argument("--rev", help="直接从 git 对象库扫描指定修订，不检出工作区")
+    revision.add_argument("--rev-range", help="扫描修订范围（如 a..b）内的每个提交，输出趋势 CSV")
+    parser.add_argument("--trend", help="趋势 CSV 输出路径（--rev-range 时默认为 ./results/platform_trend.csv）")
+    parser.add_argument("--trace", help="记录扫描和各文件的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
+    # 运行扫描
+    if args.rev or args.rev_range:
+        repo_path, subdir = repo_subdir(args.directory)
+        revisions = resolve_revisions(repo_path, args.rev, args.rev_range)
+        trend_file = args.trend or ("./results/platform_trend.csv" if args.rev_range else None)
+        scan_revisions(repo_path, revisions, args.output, trend_file, jobs=jobs, subdir=subdir)
+    else:
+        scan_all_cs_files(args.directory, args.output, jobs=jobs)
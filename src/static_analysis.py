@@ -1,29 +1,53 @@
 import subprocess
 import os
+import re
+import csv
+import json
 import glob
+import argparse
+import atexit
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from reportlab.lib.pagesizes import letter, landscape  # 导入 landscape 以设置PDF为横向
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont  # 导入 TTFont 以加载自定义字体
+from analyzer_worker import AnalyzerPool, ensure_analyzer
+from analysis_cache import AnalysisCache, file_sha256
+from diagnostics_store import DiagnosticsStore
+from git_blobs import BlobReader, list_blobs, repo_subdir, resolve_revisions
+import tracing
 
+# 诊断信息行，例如 "(8,12): error CS0246: ..." 或 "error CS5001: ..."
+DIAGNOSTIC_SEVERITY_PATTERN = re.compile(r"^(?:\(\d+,\d+\): )?(error|warning|info|hidden) \w+:", re.MULTILINE)
 
-def run_csharp_analyzer(analyzer_path, target_file):
+
+def run_csharp_analyzer(analyzer_path, target_file, pool=None):
     """
     运行 C# 分析器并返回输出和错误信息。
 
     :param analyzer_path: C# 分析器的路径
     :param target_file: 要分析的 C# 文件路径
+    :param pool: 常驻分析器进程池，为 None 时为该文件单独启动一个 dotnet 进程
     :return: 分析输出和错误
     """
+    if pool is not None:
+        for _, output, error in pool.analyze([target_file]):
+            return output, error
+
     command = ["dotnet", analyzer_path, target_file]
     print(f"Running command: {' '.join(command)}")  # 打印运行的命令
-    result = subprocess.run(
-        command,
-        capture_output=True,
-        text=True,
-        encoding="utf-8",  # 明确指定编码为 utf-8
-        errors="replace"  # 遇到无法解码的字符时替换为占位符
-    )
+    start = time.perf_counter()
+    with tracing.span(target_file, "file", command="dotnet"):
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",  # 明确指定编码为 utf-8
+            errors="replace"  # 遇到无法解码的字符时替换为占位符
+        )
+    tracing.observe("analyzer_latency", time.perf_counter() - start)
     print(f"Command completed with return code: {result.returncode}")  # 打印返回码
     print(f"Command output: {result.stdout}")  # 打印标准输出
     print(f"Command error: {result.stderr}")  # 打印标准错误
@@ -38,99 +62,327 @@ def run_csharp_analyzer(analyzer_path, target_file):
         return result.stdout, result.stderr
 
 
+def analyze_files(analyzer_path, cs_files, pool=None, jobs=1, cache=None):
+    """
+    分析一批 C# 文件，按输入顺序逐个产出结果。
+
+    提供 cache 时，内容和分析器均未变化的文件直接返回缓存结果，只有未命中的文件交给分析器。
+
+    jobs 大于 1 时，文件被切分成小批次分发给 jobs 个线程，每个线程占用进程池中的一个
+    分析器进程；结果仍按输入顺序产出，因此输出与串行运行完全一致。
+
+    :param analyzer_path: C# 分析器的路径
+    :param cs_files: 要分析的 C# 文件路径列表
+    :param pool: 常驻分析器进程池，为 None 时每个文件单独启动 dotnet 进程
+    :param jobs: 并发分析的线程数
+    :param cache: 增量缓存（AnalysisCache），为 None 时不使用缓存
+    :return: 生成器，产出 (文件路径, 分析输出, 错误信息)
+    """
+    if cache is not None:
+        cached = [cache.lookup(cs_file) for cs_file in cs_files]
+        misses = [cs_file for cs_file, output in zip(cs_files, cached) if output is None]
+        fresh = analyze_files(analyzer_path, misses, pool, jobs)
+        for cs_file, output in zip(cs_files, cached):
+            if output is None:
+                yield next(fresh)
+            else:
+                yield cs_file, output, ""
+        return
+
+    if jobs > 1 and len(cs_files) > 1:
+        # 批次不宜过大，保证各线程负载均衡；也不宜过小，减少请求往返
+        chunk_size = max(1, min(32, len(cs_files) // (jobs * 4)))
+        chunks = [cs_files[i:i + chunk_size] for i in range(0, len(cs_files), chunk_size)]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            # map 会立即提交所有批次，并按提交顺序返回结果
+            for chunk_results in executor.map(lambda chunk: list(analyze_files(analyzer_path, chunk, pool)), chunks):
+                yield from chunk_results
+        return
+
+    if pool is not None:
+        yield from pool.analyze(cs_files)
+        return
+    for cs_file in cs_files:
+        output, error = run_csharp_analyzer(analyzer_path, cs_file)
+        yield cs_file, output, error
+
+
+def analyze_project(analyzer_path, project_name, cs_files, pool=None):
+    """
+    项目模式：一个模块的所有文件作为一个编译分析，框架引用只加载一次，并运行分析器中注册的规则。
+
+    文件之间的类型引用可以解析，不再出现大量误报的 CS0246；由于每个文件的结果依赖于同一模块的其他文件，
+    项目模式不使用按文件内容缓存的增量缓存。
+
+    :param analyzer_path: C# 分析器的路径
+    :param project_name: 项目（模块）名称
+    :param cs_files: 模块中的 C# 文件路径列表
+    :param pool: 常驻分析器进程池，为 None 时临时启动一个分析器进程
+    :return: 生成器，产出 (文件路径, 分析输出, 错误信息, 诊断列表)
+    """
+    if pool is None:
+        with AnalyzerPool(analyzer_path) as pool:
+            yield from pool.analyze_project(project_name, cs_files)
+        return
+    yield from pool.analyze_project(project_name, cs_files)
+
+
+def find_module_cs_files(module_path):
+    """
+    获取模块中的所有 .cs 文件（排序后返回，保证每次运行顺序一致）。
+
+    :param module_path: 模块的路径
+    :return: .cs 文件路径列表
+    """
+    return sorted(glob.glob(os.path.join(module_path, "**", "*.cs"), recursive=True))
+
+
+def find_single_cs_files(root_path):
+    """
+    获取直接存放在根路径下的 .cs 文件（排序后返回）。
+
+    :param root_path: 包含 C# 文件的根路径
+    :return: .cs 文件路径列表
+    """
+    return sorted(os.path.join(root_path, f) for f in os.listdir(root_path)
+                  if f.endswith('.cs') and os.path.isfile(os.path.join(root_path, f)))
+
+
+_registered_fonts = set()  # 已注册的字体文件，避免每生成一份报告都重新解析字体
+
+
+def register_font(font_path):
+    """
+    注册中文字体（同一字体文件只注册一次）。
+
+    :param font_path: 支持中文的字体文件路径（如 msyh.ttc）
+    """
+    if font_path not in _registered_fonts:
+        pdfmetrics.registerFont(TTFont("MSYH", font_path))
+        _registered_fonts.add(font_path)
+
+
+class PdfReportWriter:
+    """
+    逐行写入的 PDF 报告，写满一页即换页，调用方无需先收集全部报告内容。
+    """
+
+    def __init__(self, output_path, font_path, pdf_width=1000):
+        """
+        :param output_path: 输出 PDF 的路径
+        :param font_path: 支持中文的字体文件路径（如 msyh.ttc）
+        :param pdf_width: PDF 的宽度（自定义）
+        """
+        register_font(font_path)
+        self.output_path = output_path
+
+        # 创建 PDF 画布，设置为横向
+        self.width, self.height = pdf_width, landscape(letter)[1]
+        self.canvas = canvas.Canvas(output_path, pagesize=(self.width, self.height))  # 使用自定义宽度
+
+        # 设置字体为支持中文的字体
+        self.canvas.setFont("MSYH", 12)
+
+        # 添加标题
+        self.canvas.drawString(30, self.height - 30, "静态分析报告")
+        self.canvas.line(30, self.height - 32, self.width - 30, self.height - 32)
+        self.y = self.height - 50
+
+    def write(self, entry):
+        """
+        写入一行报告内容。
+
+        :param entry: 报告行
+        """
+        self.canvas.drawString(30, self.y, entry)
+        self.y -= 15
+        if self.y < 50:  # 如果内容超出页面，创建新页面
+            self.canvas.showPage()
+            self.canvas.setFont("MSYH", 12)
+            self.y = self.height - 50
+
+    def write_all(self, entries):
+        for entry in entries:
+            self.write(entry)
+
+    def close(self):
+        # 保存 PDF
+        self.canvas.save()
+        tracing.count_bytes("written", os.path.getsize(self.output_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 def generate_pdf_report(report_data, output_path, font_path, pdf_width=1000):
     """
     生成 PDF 报告。
 
-    :param report_data: 要写入 PDF 的报告数据
+    :param report_data: 要写入 PDF 的报告数据（任意可迭代对象，逐行消费）
     :param output_path: 输出 PDF 的路径
     :param font_path: 支持中文的字体文件路径（如 msyh.ttc）
     :param pdf_width: PDF 的宽度（自定义）
     """
-    # 注册中文字体
-    pdfmetrics.registerFont(TTFont("MSYH", font_path))
+    with PdfReportWriter(output_path, font_path, pdf_width) as writer:
+        writer.write_all(report_data)
+
 
-    # 创建 PDF 画布，设置为横向
-    c = canvas.Canvas(output_path, pagesize=(pdf_width, landscape(letter)[1]))  # 使用自定义宽度
-    width, height = pdf_width, landscape(letter)[1]
+def format_result_lines(file_name, output, error):
+    """
+    将单个文件的分析结果转换为报告行。
 
-    # 设置字体为支持中文的字体
-    c.setFont("MSYH", 12)
+    :param file_name: C# 文件名
+    :param output: 分析输出
+    :param error: 错误信息
+    :return: 报告行列表
+    """
+    if error:
+        return [f"Error in {file_name}: {error.strip()}"]
+    if output is None:
+        return [f"Error in {file_name}: No output from C# analyzer."]
+    # 将输出按行分割，每条信息前加空格格式化
+    return [f"Results for {file_name}:"] + [f"    {line.strip()}" for line in output.strip().splitlines()]
+
+
+def write_result_file(result_file, output, error):
+    """
+    保存单个文件的分析结果。
 
-    # 添加标题
-    c.drawString(30, height - 30, "静态分析报告")
-    c.line(30, height - 32, width - 30, height - 32)
-    y = height - 50
+    :param result_file: .result 文件路径
+    :param output: 分析输出
+    :param error: 错误信息
+    """
+    # 使用 utf-8 编码写入文件，并处理可能的编码错误
+    with open(result_file, "w", encoding="utf-8", errors="replace") as f:
+        if error:
+            f.write(f"Error: {error}\n")
+        elif output is None:
+            f.write("Error: No output from C# analyzer.\n")
+        else:
+            f.write(output)
+    tracing.count_bytes("written", os.path.getsize(result_file))
+
+
+def read_result_file(result_file):
+    """
+    读取 write_result_file 保存的分析结果。
 
-    # 写入报告内容
-    for entry in report_data:
-        c.drawString(30, y, entry)
-        y -= 15
-        if y < 50:  # 如果内容超出页面，创建新页面
-            c.showPage()
-            c.setFont("MSYH", 12)
-            y = height - 50
+    :param result_file: .result 文件路径
+    :return: (分析输出, 错误信息)
+    """
+    with open(result_file, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read()
+    tracing.count_bytes("read", os.path.getsize(result_file))
+    if content.startswith("Error: "):
+        return None, content[len("Error: "):]
+    return content, ""
 
-    # 保存 PDF
-    c.save()
 
+def import_result_files(store, output_folder):
+    """
+    把磁盘上已有的 .result 文件导入诊断库（诊断库为空时，用于根据旧的分析结果重新生成报告）。
 
-def analyze_module(analyzer_path, module_path, output_folder, font_path):
+    :param store: 诊断库（DiagnosticsStore）
+    :param output_folder: 输出文件夹路径
+    :return: 导入的文件数
+    """
+    entries = sorted(os.listdir(output_folder))
+    result_files = []
+    for module_dir in (e for e in entries if os.path.isdir(os.path.join(output_folder, e))):
+        module_output_folder = os.path.join(output_folder, module_dir)
+        # 模块的 .result 文件按源文件在模块内的相对路径存放在子目录中
+        for dir_path, dir_names, file_names in os.walk(module_output_folder):
+            dir_names.sort()
+            result_files.extend((module_dir, os.path.relpath(os.path.join(dir_path, f), output_folder))
+                                for f in sorted(file_names) if f.endswith(".result"))
+    result_files.extend(("", e) for e in entries
+                        if e.endswith(".result") and os.path.isfile(os.path.join(output_folder, e)))
+
+    for module, result_name in result_files:
+        output, error = read_result_file(os.path.join(output_folder, result_name))
+        store.add_file(module, result_name[:-len(".result")].replace(os.sep, "/"), output, error)
+    store.commit()
+    return len(result_files)
+
+
+def iter_report_lines(store, module=None, path=None):
+    """
+    从诊断库逐个文件生成报告行，不在内存中保留全部结果。
+
+    :param store: 诊断库（DiagnosticsStore）
+    :param module: 只包含该模块的文件
+    :param path: 只包含该文件
+    :return: 生成器，产出报告行
+    """
+    for file_path, output, error in store.iter_results(module, path):
+        yield from format_result_lines(os.path.basename(file_path), output, error)
+
+
+def analyze_module(analyzer_path, module_path, output_folder, font_path, pool=None, analyzed=None, cache=None,
+                   store=None, project=False):
     """
     分析一个模块中的所有 C# 文件。
 
+    每个文件的结果在产出时即解析为诊断记录写入诊断库，模块报告在模块分析完成后从诊断库生成。
+
     :param analyzer_path: C# 分析器的路径
     :param module_path: 模块的路径
     :param output_folder: 输出文件夹路径
     :param font_path: 支持中文的字体文件路径（如 msyh.ttc）
-    :return: 模块的分析结果
+    :param pool: 常驻分析器进程池
+    :param analyzed: 已在别处调度的分析结果迭代器（按 find_module_cs_files 的顺序），为 None 时在此分析
+    :param cache: 增量缓存（AnalysisCache），分析成功的结果会登记到缓存中
+    :param store: 诊断库（DiagnosticsStore），为 None 时使用临时的内存数据库
+    :param project: 是否使用项目模式（整个模块作为一个编译分析），此时不使用 cache
+    :return: 分析的文件数
     """
+    if store is None:
+        with DiagnosticsStore(":memory:") as store:
+            return analyze_module(analyzer_path, module_path, output_folder, font_path, pool, analyzed, cache,
+                                  store, project)
+
     module_name = os.path.basename(module_path)
     module_output_folder = os.path.join(output_folder, module_name)
     os.makedirs(module_output_folder, exist_ok=True)
 
-    report_data = []
-    all_results = []  # 用于最终报告的集合
-
     # 获取模块中的所有 .cs 文件
-    cs_files = glob.glob(os.path.join(module_path, "**", "*.cs"), recursive=True)
+    cs_files = find_module_cs_files(module_path)
+    if analyzed is None:
+        if project:
+            analyzed = analyze_project(analyzer_path, module_name, cs_files, pool)
+        else:
+            analyzed = analyze_files(analyzer_path, cs_files, pool, cache=cache)
 
-    for cs_file in cs_files:
-        print(f"Analyzing {cs_file}...")
-        output, error = run_csharp_analyzer(analyzer_path, cs_file)
-
-        result_file = os.path.join(module_output_folder, f"{os.path.basename(cs_file)}.result")
-
-        # 使用 utf-8 编码写入文件，并处理可能的编码错误
-        with open(result_file, "w", encoding="utf-8", errors="replace") as f:
-            if error:
-                f.write(f"Error: {error}\n")
-                report_data.append(f"Error in {os.path.basename(cs_file)}: {error.strip()}")
-                all_results.append(f"Error in {os.path.basename(cs_file)}: {error.strip()}")
-            elif output is None:
-                f.write("Error: No output from C# analyzer.\n")
-                report_data.append(f"Error in {os.path.basename(cs_file)}: No output from C# analyzer.")
-                all_results.append(f"Error in {os.path.basename(cs_file)}: No output from C# analyzer.")
-            else:
-                f.write(output)
-                # 将输出按行分割，并添加到报告数据中
-                report_data.append(f"Results for {os.path.basename(cs_file)}:")
-                all_results.append(f"Results for {os.path.basename(cs_file)}:")
-                for line in output.strip().splitlines():
-                    report_data.append(f"    {line.strip()}")  # 每条信息前加空格格式化
-                    all_results.append(f"    {line.strip()}")  # 每条信息前加空格格式化
-
-        print(f"Results saved to {result_file}")
-
-    # 生成每个文件的单独 PDF 报告
     individual_pdf_path = os.path.join(output_folder, f"{module_name}_analysis_report.pdf")
-    generate_pdf_report(report_data, individual_pdf_path, font_path)
+    file_count = 0
+
+    print(f"Analyzing {len(cs_files)} files in {module_path}...")
+    with tracing.span(f"module {module_name}", files=len(cs_files)):
+        # 项目模式的结果多一项结构化诊断，直接写入诊断库，不再解析文本
+        for cs_file, output, error, *diagnostics in analyzed:
+            # 按模块内的相对路径命名，避免不同子目录中的同名文件互相覆盖
+            result_file = os.path.join(module_output_folder, f"{os.path.relpath(cs_file, module_path)}.result")
+            os.makedirs(os.path.dirname(result_file), exist_ok=True)
+            write_result_file(result_file, output, error)
+            if cache is not None and not diagnostics and not error and output is not None:
+                cache.store(cs_file, result_file)
+            store.add_file(module_name, cs_file, output, error, diagnostics[0] if diagnostics else None)
+            print(f"Results saved to {result_file}")
+            file_count += 1
+        store.commit()
+
+        # 生成模块的 PDF 报告
+        generate_pdf_report(iter_report_lines(store, module=module_name), individual_pdf_path, font_path)
     print(f"Individual PDF report generated at {individual_pdf_path}")
 
-    return all_results
+    return file_count
 
 
-def analyze_single_cs_files(analyzer_path, root_path, output_folder, font_path):
+def analyze_single_cs_files(analyzer_path, root_path, output_folder, font_path, pool=None, analyzed=None,
+                            cache=None, store=None):
     """
     分析直接存放在模块路径下的所有单独的 C# 文件。
 
@@ -138,90 +390,262 @@ def analyze_single_cs_files(analyzer_path, root_path, output_folder, font_path):
     :param root_path: 包含 C# 文件的根路径
     :param output_folder: 输出文件夹路径
     :param font_path: 支持中文的字体文件路径（如 msyh.ttc）
+    :param pool: 常驻分析器进程池
+    :param analyzed: 已在别处调度的分析结果迭代器（按 find_single_cs_files 的顺序），为 None 时在此分析
+    :param cache: 增量缓存（AnalysisCache），分析成功的结果会登记到缓存中
+    :param store: 诊断库（DiagnosticsStore），为 None 时使用临时的内存数据库
+    :return: 分析的文件数
     """
-    report_data = []
-    all_results = []  # 用于最终报告的集合
-
-    cs_files = [f for f in os.listdir(root_path) if f.endswith('.cs') and os.path.isfile(os.path.join(root_path, f))]
-
-    for cs_file in cs_files:
-        file_path = os.path.join(root_path, cs_file)
-        print(f"Analyzing single file: {file_path}...")
-        output, error = run_csharp_analyzer(analyzer_path, file_path)
-
-        result_file = os.path.join(output_folder, f"{os.path.basename(cs_file)}.result")
-
-        # 使用 utf-8 编码写入文件，并处理可能的编码错误
-        with open(result_file, "w", encoding="utf-8", errors="replace") as f:
-            if error:
-                f.write(f"Error: {error}\n")
-                report_data.append(f"Error in {os.path.basename(cs_file)}: {error.strip()}")
-                all_results.append(f"Error in {os.path.basename(cs_file)}: {error.strip()}")
-            elif output is None:
-                f.write("Error: No output from C# analyzer.\n")
-                report_data.append(f"Error in {os.path.basename(cs_file)}: No output from C# analyzer.")
-                all_results.append(f"Error in {os.path.basename(cs_file)}: No output from C# analyzer.")
-            else:
-                f.write(output)
-                # 将输出按行分割，并添加到报告数据中
-                report_data.append(f"Results for {os.path.basename(cs_file)}:")
-                all_results.append(f"Results for {os.path.basename(cs_file)}:")
-                for line in output.strip().splitlines():
-                    report_data.append(f"    {line.strip()}")  # 每条信息前加空格格式化
-                    all_results.append(f"    {line.strip()}")  # 每条信息前加空格格式化
-
+    if store is None:
+        with DiagnosticsStore(":memory:") as store:
+            return analyze_single_cs_files(analyzer_path, root_path, output_folder, font_path, pool, analyzed,
+                                           cache, store)
+
+    file_paths = find_single_cs_files(root_path)
+    if analyzed is None:
+        analyzed = analyze_files(analyzer_path, file_paths, pool, cache=cache)
+
+    file_count = 0
+    for file_path, output, error in analyzed:
+        cs_file = os.path.basename(file_path)
+        print(f"Analyzed single file: {file_path}")
+
+        result_file = os.path.join(output_folder, f"{cs_file}.result")
+        write_result_file(result_file, output, error)
+        if cache is not None and not error and output is not None:
+            cache.store(file_path, result_file)
+        store.add_file("", file_path, output, error)
         print(f"Results saved to {result_file}")
 
-        # 生成每个单独文件的 PDF 报告
-        individual_pdf_path = os.path.join(output_folder, f"{os.path.basename(cs_file)}_analysis_report.pdf")
-        generate_pdf_report(report_data, individual_pdf_path, font_path)
+        # 生成每个单独文件的 PDF 报告，只包含该文件自身的结果
+        individual_pdf_path = os.path.join(output_folder, f"{cs_file}_analysis_report.pdf")
+        generate_pdf_report(iter_report_lines(store, path=file_path), individual_pdf_path, font_path)
         print(f"Individual PDF report generated at {individual_pdf_path}")
+        file_count += 1
+    store.commit()
 
-    return all_results
+    return file_count
 
 
-def generate_final_report(all_results, output_folder, font_path):
+def generate_text_report(store, output_path):
     """
-    生成最终汇总报告 PDF。
+    生成文本汇总报告：各严重级别、各诊断代码（按消息模板）和各模块的诊断数量。
 
-    :param all_results: 所有分析结果
+    :param store: 诊断库（DiagnosticsStore）
+    :param output_path: 输出文本文件的路径
+    """
+    total_files, failed_files = store.file_counts()
+    severities = ["error", "warning", "info", "hidden"]
+    by_module = {}
+    for module, severity, count in store.counts(["module", "severity"]):
+        by_module.setdefault(module or "(root)", {})[severity] = count
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(f"Files: {total_files}, failed: {failed_files}\n\n")
+        f.write("By severity:\n")
+        for severity, count in store.counts(["severity"]):
+            f.write(f"  {severity:<10}{count:>10}\n")
+
+        f.write("\nBy code:\n")
+        for code, severity, template, count in store.counts(["code", "severity", "template"]):
+            f.write(f"  {code or '-':<24}{severity:<10}{count:>10}  {template}\n")
+
+        f.write("\nBy module:\n")
+        f.write(f"  {'module':<40}" + "".join(f"{severity:>10}" for severity in severities) + "\n")
+        for module, counts in sorted(by_module.items()):
+            f.write(f"  {module:<40}" + "".join(f"{counts.get(severity, 0):>10}" for severity in severities) + "\n")
+    tracing.count_bytes("written", os.path.getsize(output_path))
+    print(f"Summary report generated at {output_path}")
+
+
+def generate_final_report(store, output_folder, font_path):
+    """
+    从诊断库生成最终汇总报告 PDF 和文本汇总报告。
+
+    :param store: 诊断库（DiagnosticsStore）
     :param output_folder: 输出文件夹路径
     :param font_path: 支持中文的字体文件路径
     """
     final_report_path = os.path.join(output_folder, "final_static_analysis_report.pdf")
-    generate_pdf_report(all_results, final_report_path, font_path)
+    with tracing.span("final report"):
+        generate_pdf_report(iter_report_lines(store), final_report_path, font_path)
+        generate_text_report(store, os.path.join(output_folder, "final_static_analysis_summary.txt"))
     print(f"Final report generated at {final_report_path}")
 
 
+def count_severities(output):
+    """
+    统计分析输出中各严重级别的诊断数量。
+
+    :param output: 分析输出
+    :return: {"error": n, "warning": n, "info": n, "hidden": n}
+    """
+    counts = {"error": 0, "warning": 0, "info": 0, "hidden": 0}
+    for severity in DIAGNOSTIC_SEVERITY_PATTERN.findall(output):
+        counts[severity] += 1
+    return counts
+
+
+def analyze_revisions(analyzer_path, repo_path, revisions, trend_file, memo_path, pool, jobs=1, subdir=None):
+    """
+    直接从 git 对象库分析历史修订，生成诊断数量趋势 CSV。
+
+    分析成功的结果按 blob OID 记录在 memo_path 中，同一个 blob 在所有修订（以及后续运行）中只分析一次。
+
+    :param analyzer_path: C# 分析器的路径
+    :param repo_path: git 仓库路径
+    :param revisions: [(提交哈希, 提交时间)]，由 resolve_revisions 得到
+    :param trend_file: 趋势 CSV 路径，每个修订一行
+    :param memo_path: blob 分析结果记录文件路径（JSON）
+    :param pool: 常驻分析器进程池
+    :param jobs: 并发分析的线程数
+    :param subdir: 只分析仓库中该子目录下的文件
+    """
+    analyzer_hash = file_sha256(analyzer_path)
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("analyzer") == analyzer_hash:  # 分析器变化后旧结果作废
+            memo = {oid: counts for oid, counts in saved["blobs"].items() if "failed" not in counts}
+
+    # 分析失败的 blob 只在本次运行中计数，不写入记录文件，下次运行会重新分析
+    failed = set()
+    trend = []
+    with BlobReader(repo_path) as reader:
+        for commit, date in revisions:
+            blobs = list_blobs(repo_path, commit, subdir)
+
+            # 只分析此前没有见过的 blob，源代码直接通过标准输入交给分析器
+            new_blobs = list({oid: path for path, oid in blobs if oid not in memo and oid not in failed}.items())
+            with tracing.span(f"revision {commit[:12]}", files=len(blobs), new_blobs=len(new_blobs)):
+                items = [{"file": oid, "source": reader.read_text(oid)} for oid, _ in new_blobs]
+                for oid, output, error in analyze_files(analyzer_path, items, pool, jobs):
+                    if not error and output is not None:
+                        memo[oid] = count_severities(output)
+                    else:
+                        failed.add(oid)
+            print(f"{commit[:12]} {date}: {len(blobs)} files, {len(new_blobs)} new blobs analyzed")
+
+            row = {"commit": commit, "date": date, "files": len(blobs),
+                   "error": 0, "warning": 0, "info": 0, "hidden": 0, "failed": 0}
+            for _, oid in blobs:
+                if oid in failed:
+                    row["failed"] += 1
+                    continue
+                for key, count in memo[oid].items():
+                    row[key] += count
+            trend.append(row)
+
+    with open(memo_path, "w", encoding="utf-8") as f:
+        json.dump({"analyzer": analyzer_hash, "blobs": memo}, f)
+
+    with open(trend_file, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["commit", "date", "files", "error", "warning", "info", "hidden",
+                                               "failed"])
+        writer.writeheader()
+        writer.writerows(trend)
+    print(f"Trend saved to {trend_file}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="使用 Roslyn 对 SteamTools 源码进行静态分析")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="并发分析的分析器进程数，0 表示使用全部 CPU 核心（默认 1，即串行）")
+    parser.add_argument("--no-cache", action="store_true", help="忽略增量缓存，重新分析所有文件")
+    parser.add_argument("--report-only", action="store_true",
+                        help="不运行分析，直接根据诊断库（为空时导入已有的 .result 文件）重新生成最终汇总报告")
+    revision = parser.add_mutually_exclusive_group()
+    revision.add_argument("--rev", help="直接从 git 对象库分析指定修订，不检出工作区，输出诊断数量")
+    revision.add_argument("--rev-range", help="分析修订范围（如 a..b）内的每个提交，输出诊断数量趋势")
+    parser.add_argument("--project", action="store_true",
+                        help="项目模式：每个模块作为一个编译分析，解析模块内的类型引用并运行自定义规则（不使用增量缓存）")
+    parser.add_argument("--trace", help="记录各阶段、各文件的耗时，结束时导出 Chrome trace JSON 并输出汇总表")
+    parser.add_argument("--source", help="SteamTools 源码目录（默认 repo/SteamTools/src）")
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.trace:
+        tracing.enable()
+        atexit.register(tracing.finish, args.trace)
+
     # 获取当前脚本的目录
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
     # 相对路径设置
-    analyzer_path = os.path.join(script_dir, "static_analysis_cs", "bin", "Debug", "net8.0", "static_analysis_cs.dll")
-    repo_path = os.path.join(script_dir, "..", "repo", "SteamTools", "src")
+    repo_path = args.source or os.path.join(script_dir, "..", "repo", "SteamTools", "src")
     output_folder = os.path.join(script_dir, "..", "results", "static_analysis")
     font_path = os.path.join(script_dir, "..", "src", "msyh.ttc")  # 字体文件路径
 
+    cache_index_path = os.path.join(script_dir, "..", "results", "static_analysis_cache.json")
+    store_path = os.path.join(script_dir, "..", "results", "static_analysis.db")
+
     os.makedirs(output_folder, exist_ok=True)
 
-    all_results = []  # 用于最终报告的集合
+    if args.report_only:
+        with DiagnosticsStore(store_path) as store:
+            if not store.file_counts()[0]:
+                print(f"Imported {import_result_files(store, output_folder)} result files into {store_path}")
+            generate_final_report(store, output_folder, font_path)
+        return
+
+    # 分析器 DLL 不纳入版本库，源码变化后自动重新构建
+    try:
+        analyzer_path = ensure_analyzer()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    if args.rev or args.rev_range:
+        git_root, subdir = repo_subdir(repo_path)
+        revisions = resolve_revisions(git_root, args.rev, args.rev_range)
+        trend_file = os.path.join(script_dir, "..", "results", "static_analysis_trend.csv")
+        memo_path = os.path.join(script_dir, "..", "results", "static_analysis_blob_memo.json")
+        with AnalyzerPool(analyzer_path, size=jobs) as pool:
+            analyze_revisions(analyzer_path, git_root, revisions, trend_file, memo_path, pool, jobs, subdir)
+        return
 
     # 获取所有模块
-    modules = [os.path.join(repo_path, module) for module in os.listdir(repo_path) if
-               os.path.isdir(os.path.join(repo_path, module))]
-
-    for module in modules:
-        print(f"Analyzing module: {os.path.basename(module)}")
-        module_results = analyze_module(analyzer_path, module, output_folder, font_path)
-        all_results.extend(module_results)
-
-    # 处理直接存放在 src 目录下的 .cs 文件
-    single_file_results = analyze_single_cs_files(analyzer_path, repo_path, output_folder, font_path)
-    all_results.extend(single_file_results)
-
-    # 生成最终汇总报告
-    generate_final_report(all_results, output_folder, font_path)
+    modules = sorted(os.path.join(repo_path, module) for module in os.listdir(repo_path) if
+                     os.path.isdir(os.path.join(repo_path, module)))
+
+    # 所有模块的文件合并为一个队列统一调度，小模块不会让并发闲置
+    module_files = [find_module_cs_files(module) for module in modules]
+    single_files = find_single_cs_files(repo_path)
+    all_files = [f for files in module_files for f in files] + single_files
+
+    # 内容与分析器均未变化的文件直接使用上次的 .result
+    cache = None if args.no_cache else AnalysisCache(cache_index_path, analyzer_path, repo_path)
+
+    # 诊断库保存本次运行的全部诊断，各报告都从中生成
+    store = DiagnosticsStore(store_path)
+    store.clear()
+
+    # 整个运行期间保持常驻的分析器进程，避免每个文件都重新启动 dotnet
+    with AnalyzerPool(analyzer_path, size=jobs) as pool, store, ThreadPoolExecutor(max_workers=jobs) as executor:
+        if args.project:
+            # 每个模块是一个编译，模块之间由 jobs 个分析器进程并行处理，结果仍按模块顺序消费
+            module_results = executor.map(
+                lambda module, files: list(analyze_project(analyzer_path, os.path.basename(module), files, pool)),
+                modules, module_files)
+            analyzed = analyze_files(analyzer_path, single_files, pool, cache=cache)
+        else:
+            # 结果按文件顺序产出，下面按模块依次消费，输出与串行运行一致
+            analyzed = analyze_files(analyzer_path, all_files, pool, jobs, cache)
+            module_results = (itertools.islice(analyzed, len(files)) for files in module_files)
+
+        for module, results in zip(modules, module_results):
+            print(f"Analyzing module: {os.path.basename(module)}")
+            analyze_module(analyzer_path, module, output_folder, font_path, pool, analyzed=results, cache=cache,
+                           store=store, project=args.project)
+
+        # 处理直接存放在 src 目录下的 .cs 文件
+        analyze_single_cs_files(analyzer_path, repo_path, output_folder, font_path, pool,
+                                analyzed=itertools.islice(analyzed, len(single_files)), cache=cache, store=store)
+
+        if cache is not None:
+            cache.save()
+            print(cache.summary())
+
+        generate_final_report(store, output_folder, font_path)
 
 
 if __name__ == "__main__":
@@ -4,8 +4,12 @@ using Microsoft.CodeAnalysis.CSharp.Syntax;
 using Microsoft.CodeAnalysis.Diagnostics;
 using System.Collections.Immutable;
 using System;
+using System.Collections.Generic;
 using System.IO;
 using System.Linq;
+using System.Text;
+using System.Text.Json;
+using System.Threading.Tasks;
 
 namespace StaticAnalysis
 {
@@ -29,6 +33,10 @@ namespace StaticAnalysis
         // 初始化分析器
         public override void Initialize(AnalysisContext context)
         {
+            // 允许 Roslyn 并发调用本分析器，不分析生成的代码
+            context.EnableConcurrentExecution();
+            context.ConfigureGeneratedCodeAnalysis(GeneratedCodeAnalysisFlags.None);
+
             // 注册方法声明的分析
             context.RegisterSyntaxNodeAction(AnalyzeNode, SyntaxKind.MethodDeclaration);
         }
@@ -47,33 +55,282 @@ namespace StaticAnalysis
             }
         }
 
-        // 主程序入口
-        public static void Main(string[] args)
+        // 所有文件共用的元数据引用，避免每个文件重复加载
+        private static readonly MetadataReference[] References =
         {
-            Console.OutputEncoding = System.Text.Encoding.UTF8;
-            if (args.Length == 0)
+            MetadataReference.CreateFromFile(typeof(object).Assembly.Location)
+        };
+
+        // 项目模式使用的框架程序集（运行时目录下的全部程序集），首次使用时加载一次，之后所有模块共用
+        private static readonly Lazy<MetadataReference[]> FrameworkReferences = new Lazy<MetadataReference[]>(() =>
+        {
+            var runtimeDir = Path.GetDirectoryName(typeof(object).Assembly.Location);
+            var trusted = (AppContext.GetData("TRUSTED_PLATFORM_ASSEMBLIES") as string ?? "").Split(Path.PathSeparator);
+            return trusted
+                .Where(path => string.Equals(Path.GetDirectoryName(path), runtimeDir, StringComparison.OrdinalIgnoreCase))
+                .Select(path => (MetadataReference)MetadataReference.CreateFromFile(path))
+                .ToArray();
+        });
+
+        // 项目模式运行的分析器
+        private static readonly ImmutableArray<DiagnosticAnalyzer> Analyzers =
+            ImmutableArray.Create<DiagnosticAnalyzer>(new StaticAnalysisAnalyzer());
+
+        private static readonly CSharpParseOptions ProjectParseOptions =
+            CSharpParseOptions.Default.WithLanguageVersion(LanguageVersion.Latest);
+
+        // 与 SDK 项目 ImplicitUsings 生成的全局 using 相同，避免常用类型被误报为找不到
+        private const string ImplicitUsings =
+            "global using global::System;\n" +
+            "global using global::System.Collections.Generic;\n" +
+            "global using global::System.IO;\n" +
+            "global using global::System.Linq;\n" +
+            "global using global::System.Net.Http;\n" +
+            "global using global::System.Threading;\n" +
+            "global using global::System.Threading.Tasks;\n";
+
+        // 项目模式下单个文件的分析结果
+        public class FileResult
+        {
+            public string File { get; set; }
+            public string Output { get; set; }
+            public string Error { get; set; }
+            public List<Dictionary<string, object>> Diagnostics { get; set; }
+        }
+
+        // 诊断信息的结构化表示，行列号从 1 开始
+        private static Dictionary<string, object> DescribeDiagnostic(Diagnostic diagnostic)
+        {
+            var span = diagnostic.Location.GetLineSpan();
+            return new Dictionary<string, object>
             {
-                Console.WriteLine("Please provide the path to a C# file.");
-                return;
+                ["id"] = diagnostic.Id,
+                ["severity"] = diagnostic.Severity.ToString().ToLowerInvariant(),
+                ["line"] = span.StartLinePosition.Line + 1,
+                ["column"] = span.StartLinePosition.Character + 1,
+                ["end_line"] = span.EndLinePosition.Line + 1,
+                ["end_column"] = span.EndLinePosition.Character + 1,
+                ["message"] = diagnostic.GetMessage(),
+            };
+        }
+
+        // 项目模式：一个模块的所有文件放进同一个编译，共用框架引用，并发运行已注册的分析器，按文件返回诊断
+        public static List<FileResult> AnalyzeProject(string projectName, List<(string Path, string Source)> files)
+        {
+            var results = files.Select(file => new FileResult { File = file.Path }).ToList();
+
+            // 并行解析各文件，读取失败的文件单独记为错误，不影响其余文件
+            var trees = new SyntaxTree[files.Count];
+            Parallel.For(0, files.Count, i =>
+            {
+                var (filePath, source) = files[i];
+                try
+                {
+                    trees[i] = CSharpSyntaxTree.ParseText(source ?? File.ReadAllText(filePath), ProjectParseOptions, filePath);
+                }
+                catch (Exception ex)
+                {
+                    results[i].Error = ex.ToString();
+                }
+            });
+
+            var syntaxTrees = trees.Where(tree => tree != null)
+                .Append(CSharpSyntaxTree.ParseText(ImplicitUsings, ProjectParseOptions, $"{projectName}.GlobalUsings.g.cs"));
+            var compilation = CSharpCompilation.Create(
+                projectName,
+                syntaxTrees,
+                FrameworkReferences.Value,
+                new CSharpCompilationOptions(OutputKind.DynamicallyLinkedLibrary, concurrentBuild: true));
+            var analyzerOptions = new CompilationWithAnalyzersOptions(
+                new AnalyzerOptions(ImmutableArray<AdditionalText>.Empty),
+                onAnalyzerException: null,
+                concurrentAnalysis: true,
+                logAnalyzerExecutionTime: false);
+            var diagnostics = compilation.WithAnalyzers(Analyzers, analyzerOptions)
+                .GetAllDiagnosticsAsync().GetAwaiter().GetResult();
+
+            // 按文件分组；没有源码位置的诊断（如引用加载失败）输出到标准错误
+            var byFile = new Dictionary<string, List<Diagnostic>>();
+            foreach (var diagnostic in diagnostics)
+            {
+                var tree = diagnostic.Location.SourceTree;
+                if (tree == null)
+                {
+                    Console.Error.WriteLine($"{projectName}: {diagnostic}");
+                    continue;
+                }
+                if (!byFile.TryGetValue(tree.FilePath, out var list))
+                {
+                    byFile[tree.FilePath] = list = new List<Diagnostic>();
+                }
+                list.Add(diagnostic);
             }
 
-            var filePath = args[0];
-            var code = File.ReadAllText(filePath);
+            foreach (var result in results.Where(result => result.Error == null))
+            {
+                var fileDiagnostics = byFile.TryGetValue(result.File, out var list)
+                    ? list.OrderBy(d => d.Location.SourceSpan.Start).ThenBy(d => d.Id).ToList()
+                    : new List<Diagnostic>();
+                result.Diagnostics = fileDiagnostics.Select(DescribeDiagnostic).ToList();
+
+                // 文本输出与单文件模式格式相同：(行,列): 严重级别 ID: 信息
+                var builder = new StringBuilder();
+                foreach (var item in result.Diagnostics)
+                {
+                    builder.AppendLine($"({item["line"]},{item["column"]}): {item["severity"]} {item["id"]}: {item["message"]}");
+                }
+                result.Output = builder.ToString();
+            }
+            return results;
+        }
 
+        // 分析单个文件，返回诊断信息文本（每条诊断一行）
+        public static string AnalyzeFile(string filePath)
+        {
+            return AnalyzeSource(File.ReadAllText(filePath));
+        }
+
+        // 分析一段源代码，返回诊断信息文本（每条诊断一行）
+        public static string AnalyzeSource(string code)
+        {
             // 解析代码为语法树
             var tree = CSharpSyntaxTree.ParseText(code);
             var compilation = CSharpCompilation.Create("Analysis")
-                .AddReferences(MetadataReference.CreateFromFile(typeof(object).Assembly.Location))
+                .AddReferences(References)
                 .AddSyntaxTrees(tree);
 
             // 获取诊断信息
             var diagnostics = compilation.GetDiagnostics();
 
-            // 输出诊断信息
+            var builder = new StringBuilder();
             foreach (var diagnostic in diagnostics)
             {
-                Console.WriteLine(diagnostic);
+                builder.AppendLine(diagnostic.ToString());
+            }
+            return builder.ToString();
+        }
+
+        // 常驻服务模式：从标准输入逐行读取 JSON 请求，每个文件输出一行 JSON 结果
+        // 请求格式：{"file": "a.cs"} 或 {"files": ["a.cs", "b.cs"]}
+        // files 中的元素也可以是 {"file": "a.cs", "source": "..."}，此时直接分析 source，不读取磁盘
+        // 结果格式：{"file": "a.cs", "output": "...", "error": null}
+        // 请求中带 "project": "模块名" 时使用项目模式，files 合并为一个编译分析，
+        // 结果额外包含 "diagnostics": [{"id", "severity", "line", "column", "end_line", "end_column", "message"}]
+        public static void RunServer()
+        {
+            var stdout = new StreamWriter(Console.OpenStandardOutput(), new UTF8Encoding(false)) { AutoFlush = false };
+            var stdin = new StreamReader(Console.OpenStandardInput(), new UTF8Encoding(false));
+
+            string line;
+            while ((line = stdin.ReadLine()) != null)
+            {
+                if (string.IsNullOrWhiteSpace(line))
+                {
+                    continue;
+                }
+
+                // (文件路径, 内联源代码)，源代码为 null 时从磁盘读取
+                var files = new List<(string Path, string Source)>();
+                string project = null;
+                using (var request = JsonDocument.Parse(line))
+                {
+                    var root = request.RootElement;
+                    if (root.TryGetProperty("project", out var projectName))
+                    {
+                        project = projectName.GetString();
+                    }
+                    if (root.TryGetProperty("file", out var file))
+                    {
+                        files.Add((file.GetString(), null));
+                    }
+                    if (root.TryGetProperty("files", out var batch))
+                    {
+                        foreach (var item in batch.EnumerateArray())
+                        {
+                            if (item.ValueKind == JsonValueKind.String)
+                            {
+                                files.Add((item.GetString(), null));
+                            }
+                            else
+                            {
+                                var source = item.TryGetProperty("source", out var text) ? text.GetString() : null;
+                                files.Add((item.GetProperty("file").GetString(), source));
+                            }
+                        }
+                    }
+                }
+
+                if (project != null)
+                {
+                    List<FileResult> results;
+                    try
+                    {
+                        results = AnalyzeProject(project, files);
+                    }
+                    catch (Exception ex)
+                    {
+                        // 整个编译失败时，每个文件都记为失败
+                        results = files.Select(file => new FileResult { File = file.Path, Error = ex.ToString() }).ToList();
+                    }
+
+                    foreach (var result in results)
+                    {
+                        stdout.WriteLine(JsonSerializer.Serialize(new Dictionary<string, object>
+                        {
+                            ["file"] = result.File,
+                            ["output"] = result.Output,
+                            ["error"] = result.Error,
+                            ["diagnostics"] = result.Diagnostics,
+                        }));
+                    }
+                    stdout.Flush();
+                    continue;
+                }
+
+                foreach (var (filePath, source) in files)
+                {
+                    string output = null;
+                    string error = null;
+                    try
+                    {
+                        output = source != null ? AnalyzeSource(source) : AnalyzeFile(filePath);
+                    }
+                    catch (Exception ex)
+                    {
+                        error = ex.ToString();
+                    }
+
+                    // 每个文件一条记录，立即刷新以便调用方流式读取
+                    var record = JsonSerializer.Serialize(new Dictionary<string, string>
+                    {
+                        ["file"] = filePath,
+                        ["output"] = output,
+                        ["error"] = error,
+                    });
+                    stdout.WriteLine(record);
+                    stdout.Flush();
+                }
             }
         }
+
+        // 主程序入口
+        public static void Main(string[] args)
+        {
+            Console.OutputEncoding = System.Text.Encoding.UTF8;
+            if (args.Length == 0)
+            {
+                Console.WriteLine("Please provide the path to a C# file.");
+                return;
+            }
+
+            if (args[0] == "--server")
+            {
+                RunServer();
+                return;
+            }
+
+            // 输出诊断信息
+            Console.Write(AnalyzeFile(args[0]));
+        }
     }
 }
@@ -0,0 +1,219 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+# 未启用时所有记录函数直接返回，对正常运行几乎没有开销
+_enabled = False
+_lock = threading.Lock()
+_events = []
+_bytes = Counter()
+_histograms = defaultdict(Counter)  # 名称 -> {桶上限（毫秒）: 次数}
+
+
+def enable():
+    """
+    开始记录。
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def add_event(event):
+    """
+    添加一个已完成的事件（Chrome trace 的 "X" 事件），事件 args 中的 bytes_read / bytes_written 计入字节统计。
+
+    :param event: 事件字典，ts 和 dur 单位为纳秒，导出时转换为微秒
+    """
+    with _lock:
+        _events.append(event)
+        for kind in ("read", "written"):
+            _bytes[kind] += event.get("args", {}).get(f"bytes_{kind}", 0)
+
+
+@contextmanager
+def _span(name, category, args):
+    start = time.perf_counter_ns()
+    span_args = dict(args)
+    try:
+        yield span_args
+    finally:
+        add_event({
+            "name": name,
+            "cat": category,
+            "ts": start,
+            "dur": time.perf_counter_ns() - start,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": span_args,
+        })
+
+
+def span(name, category="stage", **args):
+    """
+    记录一段代码的耗时。
+
+    用法：with tracing.span("scan", "stage", files=10) as args: ...，可以在代码块中向 args 追加信息。
+
+    :param name: 名称，如文件路径或请求地址
+    :param category: 类别：stage（阶段）、file（单个文件）、http（HTTP 请求）、process（外部进程）等
+    :param args: 附加信息
+    """
+    if not _enabled:
+        return nullcontext({})
+    return _span(name, category, args)
+
+
+def complete(name, category, start, **args):
+    """
+    记录一个从 start 开始、到现在结束的事件，用于无法用 with 包裹的代码（如逐条产出结果的循环）。
+
+    :param name: 名称
+    :param category: 类别
+    :param start: 开始时间（time.perf_counter_ns()）
+    :param args: 附加信息
+    :return: 当前时间（time.perf_counter_ns()），可作为下一个事件的开始时间
+    """
+    now = time.perf_counter_ns()
+    if _enabled:
+        add_event({"name": name, "cat": category, "ts": start, "dur": now - start, "pid": os.getpid(),
+                   "tid": threading.get_ident(), "args": args})
+    return now
+
+
+def count_bytes(kind, size):
+    """
+    :param kind: "read" 或 "written"
+    :param size: 字节数
+    """
+    if _enabled:
+        with _lock:
+            _bytes[kind] += size
+
+
+def observe(name, seconds):
+    """
+    把一次耗时计入直方图，桶按 2 的幂次划分（毫秒）。
+
+    :param name: 直方图名称，如 analyzer_latency
+    :param seconds: 耗时（秒）
+    """
+    if _enabled:
+        bucket = 2 ** max(0, math.ceil(math.log2(max(seconds * 1000, 1e-3))))
+        with _lock:
+            _histograms[name][bucket] += 1
+
+
+def traced_call(category, name, function, *args, **kwargs):
+    """
+    在子进程中调用 function，并把耗时和字节统计随结果一起返回，由父进程通过 add_event 记录。
+
+    :return: (function 的返回值, 事件字典)
+    """
+    before = dict(_bytes)
+    was_enabled = _enabled
+    enable()  # 子进程不一定继承启用状态（spawn）
+    start = time.perf_counter_ns()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        duration = time.perf_counter_ns() - start
+        if not was_enabled:
+            disable()
+    event_args = {}
+    with _lock:
+        for kind in ("read", "written"):
+            # 字节数转入事件中，由 add_event 重新计入，串行调用时不会重复统计
+            event_args[f"bytes_{kind}"] = _bytes[kind] - before.get(kind, 0)
+            _bytes[kind] -= event_args[f"bytes_{kind}"]
+    return result, {"name": name, "cat": category, "ts": start, "dur": duration, "pid": os.getpid(),
+                    "tid": threading.get_ident(), "args": event_args}
+
+
+def export_chrome_trace(path):
+    """
+    导出为 Chrome trace JSON，可在 chrome://tracing 或 Perfetto 中查看。
+
+    :param path: 输出文件路径
+    """
+    with _lock:
+        events = list(_events)
+    origin = min((event["ts"] for event in events), default=0)
+    trace = [{**event, "ph": "X", "ts": (event["ts"] - origin) / 1000, "dur": event["dur"] / 1000}
+             for event in events]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def summary(top=10):
+    """
+    :param top: 列出最慢的文件数
+    :return: 汇总表文本：各阶段耗时、各类别的次数与耗时、耗时直方图、读写字节数和最慢的文件
+    """
+    with _lock:
+        events = list(_events)
+        histograms = {name: dict(buckets) for name, buckets in _histograms.items()}
+        byte_counts = dict(_bytes)
+
+    lines = [f"{'stage':<48}{'count':>8}{'total s':>10}{'max s':>10}"]
+    stages = defaultdict(list)
+    categories = defaultdict(list)
+    for event in events:
+        if event["cat"] == "stage":
+            stages[event["name"]].append(event["dur"])
+        else:
+            categories[event["cat"]].append(event["dur"])
+    for name, durations in stages.items():
+        lines.append(f"{name[:47]:<48}{len(durations):>8}{sum(durations) / 1e9:>10.3f}{max(durations) / 1e9:>10.3f}")
+
+    lines.append("")
+    lines.append(f"{'category':<48}{'count':>8}{'total s':>10}{'mean ms':>10}")
+    for category, durations in sorted(categories.items()):
+        lines.append(f"{category:<48}{len(durations):>8}{sum(durations) / 1e9:>10.3f}"
+                     f"{sum(durations) / len(durations) / 1e6:>10.2f}")
+
+    for name, buckets in sorted(histograms.items()):
+        lines.append("")
+        lines.append(f"{name} (ms):")
+        total = sum(buckets.values())
+        for bucket in sorted(buckets):
+            count = buckets[bucket]
+            lines.append(f"  <= {bucket:>6} {count:>8} {'#' * max(1, round(40 * count / total))}")
+
+    lines.append("")
+    lines.append(f"Bytes read: {byte_counts.get('read', 0)}, bytes written: {byte_counts.get('written', 0)}")
+
+    slowest = sorted((event for event in events if event["cat"] == "file"), key=lambda event: -event["dur"])[:top]
+    if slowest:
+        lines.append("")
+        lines.append(f"Slowest {len(slowest)} files:")
+        for event in slowest:
+            lines.append(f"  {event['dur'] / 1e6:>10.2f} ms  {event['name']}")
+    return "\n".join(lines)
+
+
+def finish(trace_path, top=10):
+    """
+    导出 Chrome trace 并输出汇总表；trace_path 为空时什么也不做。
+
+    :param trace_path: Chrome trace 输出路径
+    :param top: 列出最慢的文件数
+    """
+    if not trace_path:
+        return
+    export_chrome_trace(trace_path)
+    print(summary(top))
+    print(f"Trace saved to {trace_path}")
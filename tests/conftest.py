@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 源码模块直接放在 src/ 下并以顶层模块互相导入，测试同样从 src/ 导入
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
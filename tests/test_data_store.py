@@ -0,0 +1,28 @@
+import io
+import json
+
+import pytest
+
+from data_store import iter_json_array
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+def test_iter_json_array_numbers_split_across_chunks(chunk_size):
+    values = [1.5, 2.25, -0.125, 1e10, 2.5E-3, 123456789, 0, -7, 6.02e+23]
+    text = json.dumps(values) + "\n"
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == values
+    # 紧凑格式（元素之间没有空格）
+    compact = json.dumps(values, separators=(",", ":"))
+    assert list(iter_json_array(io.StringIO(compact), chunk_size)) == values
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+def test_iter_json_array_records(chunk_size):
+    records = [{"number": 1, "title": "a, b]"}, {"number": 2, "labels": [], "score": 0.5}, "x", None, True]
+    text = json.dumps(records, indent=2)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == records
+
+
+def test_iter_json_array_truncated():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO("[1.5, 2."), 3))
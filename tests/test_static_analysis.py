@@ -0,0 +1,31 @@
+import os
+
+import static_analysis
+from diagnostics_store import DiagnosticsStore
+
+
+def test_same_named_files_in_module_keep_separate_results(tmp_path, monkeypatch):
+    # 不生成 PDF，只检查 .result 文件
+    monkeypatch.setattr(static_analysis, "generate_pdf_report", lambda *args, **kwargs: None)
+
+    module_path = tmp_path / "src" / "Module"
+    for sub in ("A", "B"):
+        (module_path / sub).mkdir(parents=True)
+        (module_path / sub / "Same.cs").write_text(f"class {sub} {{}}\n", encoding="utf-8")
+    cs_files = static_analysis.find_module_cs_files(str(module_path))
+    analyzed = [(cs_file, f"output of {os.path.basename(os.path.dirname(cs_file))}\n", "")
+                for cs_file in cs_files]
+
+    output_folder = tmp_path / "results"
+    count = static_analysis.analyze_module(None, str(module_path), str(output_folder), None,
+                                           analyzed=iter(analyzed))
+
+    assert count == 2
+    for sub in ("A", "B"):
+        result_file = output_folder / "Module" / sub / "Same.cs.result"
+        assert static_analysis.read_result_file(str(result_file)) == (f"output of {sub}\n", "")
+
+    # 从 .result 文件重新导入时两个文件仍各自独立
+    with DiagnosticsStore(":memory:") as store:
+        assert static_analysis.import_result_files(store, str(output_folder)) == 2
+        assert sorted(path for path, _, _ in store.iter_results("Module")) == ["Module/A/Same.cs", "Module/B/Same.cs"]